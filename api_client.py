@@ -0,0 +1,149 @@
+import json
+import time
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bytes read at a time when a response body is extracted while streaming
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class FetchResult:
+    """Result of a single API fetch."""
+
+    def __init__(self, status: int, content: bytes = b'', not_modified: bool = False, elapsed: float = 0.0,
+                 fingerprint: str = None, unchanged: bool = False, values: dict = None, errors: dict = None):
+        self.status = status
+        self.content = content
+        self.not_modified = not_modified
+        self.elapsed = elapsed  # Seconds spent on the request
+        self.fingerprint = fingerprint  # Hash of the raw response body
+        self.unchanged = unchanged  # True if the body is identical to the previous response
+        self.values = values  # Values by path if the body was extracted while streaming, else None
+        self.errors = errors  # Errors by path for the paths that could not be extracted
+
+    def json(self):
+        """Decode the response body as JSON."""
+        return json.loads(self.content)
+
+
+def fingerprint(content: bytes) -> str:
+    """Return a short hash identifying a response body."""
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+class ApiClient:
+    """HTTP client for the API with a pooled keep-alive session, timeouts and conditional GET."""
+
+    def __init__(self, url: str, headers: dict = None, connect_timeout: float = 5.0, read_timeout: float = 10.0,
+                 pool_size: int = 2):
+        self.url = url
+        self.headers = headers or {}
+        self.timeout = (connect_timeout, read_timeout)
+        self.pool_size = pool_size
+        self.session = None  # Created on the first fetch, on the update thread
+        self.adapter = None
+        self.etag = None
+        self.last_modified = None
+        self.last_fingerprint = None
+        self.stats = {'requests': 0, 'not_modified': 0, 'unchanged': 0, 'errors': 0}
+
+    def create_session(self):
+        """Create the pooled session (imports requests on first use to keep startup fast)."""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount('http://', self.adapter)
+        self.session.mount('https://', self.adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+        self.session.headers.update(self.headers)
+
+    def fetch(self, extractor=None) -> FetchResult:
+        """Fetch the API URL, flagging results the caller does not need to process.
+
+        A 304 answer is returned as not_modified, a body identical to the previous one as unchanged.
+        With a PathExtractor, the body is streamed through it instead of being read as a whole: only the
+        extracted values are returned and reading stops once all paths are found. The fingerprint then
+        covers the bytes read, which determine the values.
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+
+        if self.session is None:
+            self.create_session()
+
+        start = time.perf_counter()
+        response = None
+        try:
+            self.stats['requests'] += 1
+            response = self.session.get(self.url, headers=headers, timeout=self.timeout, stream=extractor is not None)
+            if response.status_code == 304:
+                self.stats['not_modified'] += 1
+                return FetchResult(304, not_modified=True, elapsed=time.perf_counter() - start)
+            response.raise_for_status()
+
+            # Remember validators for the next conditional request
+            self.etag = response.headers.get('ETag')
+            self.last_modified = response.headers.get('Last-Modified')
+
+            if extractor is not None:
+                digest = hashlib.blake2b(digest_size=16)
+                values, errors = extractor.extract_stream(response.iter_content(STREAM_CHUNK_SIZE), digest)
+                content = b''
+                content_fingerprint = digest.hexdigest()
+            else:
+                values = errors = None
+                content = response.content
+                content_fingerprint = fingerprint(content)
+
+            # Compare the raw body with the previous one, for servers without validators
+            unchanged = content_fingerprint == self.last_fingerprint
+            if unchanged:
+                self.stats['unchanged'] += 1
+            self.last_fingerprint = content_fingerprint
+            return FetchResult(response.status_code, content, elapsed=time.perf_counter() - start,
+                               fingerprint=content_fingerprint, unchanged=unchanged, values=values, errors=errors)
+        except Exception:
+            self.stats['errors'] += 1
+            raise
+        finally:
+            if extractor is not None and response is not None:
+                # Drops the connection if the body was not read to the end
+                response.close()
+
+    def connection_stats(self) -> dict:
+        """Return request counters including how many requests reused a pooled connection."""
+        connections = 0
+        requests_sent = 0
+        if self.adapter is not None:
+            pools = self.adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools[key]
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+        stats = dict(self.stats)
+        stats['connections'] = connections
+        stats['reused'] = max(0, requests_sent - connections)
+        responses = self.stats['requests'] - self.stats['not_modified'] - self.stats['errors']
+        stats['unchanged_rate'] = self.stats['unchanged'] / responses if responses else 0.0
+        return stats
+
+    def reset_fingerprint(self):
+        """Forget the previous response so the next one is always processed.
+
+        The validators are dropped too, otherwise the next request would be answered with 304.
+        """
+        self.last_fingerprint = None
+        self.etag = None
+        self.last_modified = None
+
+    def close(self):
+        """Close the session and its pooled connections."""
+        if self.session is not None:
+            self.session.close()
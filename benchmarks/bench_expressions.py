@@ -0,0 +1,99 @@
+"""Measure what computed icons cost per poll on top of the raw icons they are derived from.
+
+Compiles expressions over the 15 paths of a document like the stub API's, then times one poll (extracting
+the paths once and evaluating and formatting every icon) for 15 raw icons plus 0-200 derived icons, and
+checks a few results.
+
+    python benchmarks/bench_expressions.py [--polls N]
+"""
+import time
+import random
+import argparse
+
+import harness  # noqa: F401 (puts the application modules on the path)
+from expressions import compile_expression
+from json_paths import PathExtractor
+
+FIELDS = 15
+TEMPLATES = [
+    '{{values.v{a}}} - {{values.v{b}}} | .1f W',
+    '{{values.v{a}}} / 5000 * 100 | .0f %',
+    'max({{values.v{a}}}, {{values.v{b}}}, {{values.v{c}}}) | .1f',
+    'avg({{values.v{a}}}, {{values.v{b}}}) * 1000 | si Wh',
+    'abs({{values.v{a}}} - {{values.v{b}}}) / ({{values.v{c}}} + 1)',
+]
+
+
+def check():
+    """Check the results of a few definitions."""
+    values = {'a': 1500, 'b': '200.25', 'c': 7}
+    cases = {
+        'a': '1500',
+        'b | .1f kW': '200.2kW',
+        '{a} - {b} | .2f': '1299.75',
+        '-{c} * (2 + 1)': '-21',
+        'max({a}, {b}, {c}) | si W': '1.50kW',
+        'max({a})': '1500',
+        'min({c}) + sum({c})': '14',
+        'avg({a}) | si': '1.50k',
+        '{b} / {a} * 100 | f %': '13%',
+        '{a} * 1000000 | .2si': '1.5G',
+    }
+    for definition, expected in cases.items():
+        expression = compile_expression(definition)
+        result = expression.value_format.format(expression.evaluate(values))
+        assert result == expected, (definition, result, expected)
+    for invalid in ('{a} +', 'max() + {a}', 'foo({a})', '{a} ** 2', '({a}', '{a} {b}', '| W'):
+        try:
+            compile_expression(invalid)
+        except ValueError:
+            continue
+        raise AssertionError(f"{invalid!r} compiled")
+
+
+def run(derived: int, polls: int, seed: int = 1) -> dict:
+    """Time polls of 15 raw icons plus a number of derived icons."""
+    rng = random.Random(seed)
+    definitions = [f'values.v{i}' for i in range(FIELDS)]
+    for i in range(derived):
+        a, b, c = rng.sample(range(FIELDS), 3)
+        definitions.append(TEMPLATES[i % len(TEMPLATES)].format(a=a, b=b, c=c))
+
+    start = time.perf_counter()
+    expressions = [compile_expression(definition) for definition in definitions]
+    compile_time = time.perf_counter() - start
+    extractor = PathExtractor([path for expression in expressions for path in expression.paths])
+
+    documents = [{'values': {f'v{i}': rng.randrange(1000) for i in range(FIELDS)}} for _ in range(polls)]
+    samples = []
+    for document in documents:
+        start = time.perf_counter()
+        values, errors = extractor.extract(document)
+        for expression in expressions:
+            expression.value_format.format(expression.evaluate(values))
+        samples.append(time.perf_counter() - start)
+    return {'paths': len(extractor.paths), 'compile': compile_time / len(definitions), 'poll': harness.percentiles(samples)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polls', type=int, default=5000, help='polls per case')
+    args = parser.parse_args()
+
+    check()
+    print("Expression results: ok")
+
+    print(f"\n{FIELDS} raw icons plus derived icons over the same paths, {args.polls} polls:")
+    print(f"  {'derived':>8} {'paths':>6} {'compile us':>11} {'poll p50 us':>12} {'poll p99 us':>12} {'us/derived':>11}")
+    base = None
+    for derived in (0, 10, 50, 200):
+        result = run(derived, args.polls)
+        p50 = result['poll']['p50']
+        base = p50 if base is None else base
+        per_icon = (p50 - base) / derived if derived else 0.0
+        print(f"  {derived:>8} {result['paths']:>6} {result['compile'] * 1e6:>11.1f} {p50:>12.1f} "
+              f"{result['poll']['p99']:>12.1f} {per_icon:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
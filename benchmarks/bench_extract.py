@@ -0,0 +1,129 @@
+"""Compare full JSON parsing with streaming extraction of the icon paths on large documents.
+
+Synthetic documents hold a list of host records and 15 values read by the icons, placed either before
+or after the records. The full path joins the body and decodes all of it before extracting the paths,
+like response.json(); the streaming path feeds 64 KiB chunks through PathExtractor.extract_stream().
+Reports time, peak traced memory and bytes read, then fetches a padded document from a local stub API
+through ApiClient both ways.
+
+    python benchmarks/bench_extract.py [--sizes 1 10 50] [--runs N]
+"""
+import gc
+import json
+import time
+import random
+import argparse
+import tracemalloc
+
+import harness
+from api_client import ApiClient, STREAM_CHUNK_SIZE
+from json_paths import PathExtractor
+
+FIELDS = 15
+
+
+def make_document(size: int, values_first: bool, seed: int = 1) -> bytes:
+    """Return a JSON document of about `size` bytes with FIELDS values and host records."""
+    rng = random.Random(seed)
+    values = {f'v{i}': rng.randrange(1000) for i in range(FIELDS)}
+    hosts = []
+    length = 0
+    while length < size:
+        host = {
+            'name': f'host-{len(hosts)}',
+            'cpu': round(rng.random() * 100, 2),
+            'memory': rng.randrange(1 << 34),
+            'tags': ['prod', f'rack-{rng.randrange(40)}', 'say "hi"'],
+            'disks': [{'mount': '/', 'used': rng.random()}, {'mount': '/data', 'used': rng.random()}],
+            'note': 'x' * rng.randrange(60),
+        }
+        hosts.append(host)
+        length += len(json.dumps(host)) + 2
+    document = {'values': values, 'hosts': hosts} if values_first else {'hosts': hosts, 'values': values}
+    return json.dumps(document).encode()
+
+
+def chunked(data: bytes, counter: list):
+    """Yield the document in chunks, counting the bytes handed out."""
+    for start in range(0, len(data), STREAM_CHUNK_SIZE):
+        chunk = data[start:start + STREAM_CHUNK_SIZE]
+        counter[0] += len(chunk)
+        yield chunk
+
+
+def full_parse(extractor: PathExtractor, data: bytes, counter: list):
+    return extractor.extract(json.loads(b''.join(chunked(data, counter))))
+
+
+def stream_parse(extractor: PathExtractor, data: bytes, counter: list):
+    return extractor.extract_stream(chunked(data, counter))
+
+
+def measure(parse, extractor: PathExtractor, data: bytes, runs: int) -> dict:
+    """Return the best time, peak traced memory and bytes read of a parse function."""
+    best = float('inf')
+    for _ in range(runs):
+        counter = [0]
+        start = time.perf_counter()
+        result = parse(extractor, data, counter)
+        best = min(best, time.perf_counter() - start)
+        del result
+        gc.collect()
+    tracemalloc.start()
+    parse(extractor, data, [0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'time': best, 'peak': peak, 'read': counter[0]}
+
+
+def run_fetch(padding: int, polls: int) -> dict:
+    """Fetch a padded document from the stub API with and without streaming extraction."""
+    extractor = PathExtractor([f'values.v{i}' for i in range(FIELDS)])
+    timings = {}
+    with harness.StubApi(FIELDS, 1.0, padding=padding) as stub:
+        for mode in ('full', 'stream'):
+            client = ApiClient(stub.url)
+            samples = []
+            for _ in range(polls):
+                start = time.perf_counter()
+                if mode == 'stream':
+                    values = client.fetch(extractor).values
+                else:
+                    values, _ = extractor.extract(client.fetch().json())
+                samples.append(time.perf_counter() - start)
+                assert len(values) == FIELDS
+            client.close()
+            timings[mode] = harness.percentiles(samples)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 50], help='document sizes in MB')
+    parser.add_argument('--runs', type=int, default=3, help='timed runs per case (the best is reported)')
+    parser.add_argument('--polls', type=int, default=20, help='fetches per mode from the stub API')
+    args = parser.parse_args()
+
+    extractor = PathExtractor([f'values.v{i}' for i in range(FIELDS)])
+    print(f"{FIELDS} paths, {STREAM_CHUNK_SIZE // 1024} KiB chunks")
+    print(f"  {'size':>6} {'values':>7} {'mode':>7} {'time ms':>10} {'peak MiB':>10} {'read MiB':>10}")
+    for size in args.sizes:
+        for values_first in (True, False):
+            data = make_document(size << 20, values_first)
+            results = {mode: measure(parse, extractor, data, args.runs)
+                       for mode, parse in (('full', full_parse), ('stream', stream_parse))}
+            if full_parse(extractor, data, [0]) != stream_parse(extractor, data, [0]):
+                raise SystemExit("Streaming extraction returned different values")
+            for mode, result in results.items():
+                print(f"  {len(data) / (1 << 20):>5.1f}M {'first' if values_first else 'last':>7} {mode:>7} "
+                      f"{result['time'] * 1000:>10.1f} {result['peak'] / (1 << 20):>10.1f} "
+                      f"{result['read'] / (1 << 20):>10.1f}")
+            del data
+
+    padding = args.sizes[0] << 20
+    timings = run_fetch(padding, args.polls)
+    harness.print_table(f"\nApiClient.fetch() of a {args.sizes[0]} MB document from the stub API, values first:", timings)
+
+
+if __name__ == '__main__':
+    main()
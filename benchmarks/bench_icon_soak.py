@@ -0,0 +1,121 @@
+"""Soak the icon update path and check that no icon handle leaks or is destroyed twice.
+
+Drives SystemTray.update_icon with random values against the fake handle allocator, with periodic
+restyles that also switch a sparkline on the first icon on and off, icon removals and re-additions and
+a fraction of failing shell calls. Samples the number of live handles along the way, which must stay
+within the icon and chart cache sizes plus the number of icons, and checks that none are left after
+cleanup and that charts do not evict text icons.
+
+    python benchmarks/bench_icon_soak.py [--updates N] [--icons N] [--value-range N] [--failure-rate R]
+"""
+import time
+import random
+import argparse
+
+import harness
+import fake_win32
+
+
+def run(updates: int, icon_count: int, value_range: int, failure_rate: float, cache_size: int,
+        seed: int = 1) -> dict:
+    """Run the soak and return live handle samples and counters."""
+    url = 'http://127.0.0.1:9/'  # Never fetched
+    handles = fake_win32.handles
+    live_before = len(handles.live)
+    double_frees_before = handles.double_frees
+    app = harness.create_app(icon_count, url, extra_env={'RENDER_CACHE_SIZE': str(cache_size),
+                                                         'SPARKLINE_V0': '3600'})
+    import systray
+    from config import load_config
+
+    def config(value_font_size: int, sparkline: bool) -> dict:
+        environ = {'API_URL': url, 'FONT_PATH': harness.default_font(), 'SNAPSHOT_FILE': '',
+                   'RENDER_CACHE_SIZE': str(cache_size), 'VALUE_FONT_SIZE': str(value_font_size)}
+        environ.update({f'ICON_V{i}': f'values.v{i}' for i in range(icon_count)})
+        if sparkline:
+            environ['SPARKLINE_V0'] = '3600'
+        return load_config(environ)
+
+    rng = random.Random(seed)
+    original_shell = systray.Shell_NotifyIconW
+    failures = 0
+
+    def flaky_shell(message, nid):
+        nonlocal failures
+        if rng.random() < failure_rate:
+            failures += 1
+            return 0
+        return original_shell(message, nid)
+
+    systray.Shell_NotifyIconW = flaky_shell
+    samples = []
+    limit = cache_size + systray.CHART_CACHE_SIZE + icon_count
+    try:
+        start = time.perf_counter()
+        for i in range(1, updates + 1):
+            icon_id = rng.choice(list(app.icons))
+            value = rng.randrange(value_range)
+            # Spread the samples over the chart's hour, so the chart of a sparkline icon keeps moving
+            app.icons[icon_id].history.append(time.time() - 3600 * (1 - i / updates), value)
+            app.update_icon(icon_id, str(value))
+
+            if i % 25000 == 0:
+                # Re-render every icon with another font size, switching the sparkline on or off
+                even = (i // 25000) % 2 == 0
+                app.apply_config(config(17 if even else 16, even))
+            if i % 10000 == 0:
+                # Remove an icon and add it back
+                label, path, source = app.config['icons'][rng.randrange(icon_count)]
+                app.remove_icon(f"{label}_{path}")
+                app.create_icon(label, path, source)
+            if i % (updates // 20 or 1) == 0:
+                samples.append((i, len(handles.live) - live_before))
+        elapsed = time.perf_counter() - start
+    finally:
+        systray.Shell_NotifyIconW = original_shell
+
+    cache_stats = app.icon_cache.stats()
+    chart_stats = app.chart_cache.stats()
+    charts_in_icon_cache = sum(1 for key in app.icon_cache.entries if not isinstance(key[1], str))
+    app.cleanup()
+    return {
+        'elapsed': elapsed,
+        'samples': samples,
+        'limit': limit,
+        'max_live': max(live for _, live in samples),
+        'live_after_cleanup': len(handles.live) - live_before,
+        'double_frees': handles.double_frees - double_frees_before,
+        'shell_failures': failures,
+        'update_stats': dict(app.update_stats),
+        'icon_cache': cache_stats,
+        'chart_cache': chart_stats,
+        'charts_in_icon_cache': charts_in_icon_cache,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=100000, help='icon updates to apply')
+    parser.add_argument('--icons', type=int, default=10, help='number of icons')
+    parser.add_argument('--value-range', type=int, default=5000, help='number of distinct values')
+    parser.add_argument('--failure-rate', type=float, default=0.01, help='fraction of shell calls that fail')
+    parser.add_argument('--cache-size', type=int, default=256, help='icon cache size')
+    args = parser.parse_args()
+
+    result = run(args.updates, args.icons, args.value_range, args.failure_rate, args.cache_size)
+    print(f"{args.updates} updates of {args.icons} icons in {result['elapsed']:.1f}s "
+          f"({args.updates / result['elapsed']:.0f}/s), {result['shell_failures']} failed shell calls")
+    print(f"  live handles (limit {result['limit']}): " +
+          ', '.join(f"{live}@{i // 1000}k" for i, live in result['samples']))
+    print(f"  update stats: {result['update_stats']}")
+    print(f"  icon cache: {result['icon_cache']}")
+    print(f"  chart cache: {result['chart_cache']}, charts in the icon cache: {result['charts_in_icon_cache']}")
+    print(f"  live handles after cleanup: {result['live_after_cleanup']}, double frees: {result['double_frees']}")
+    if result['max_live'] > result['limit'] or result['live_after_cleanup'] or result['double_frees'] or \
+            result['charts_in_icon_cache'] or not result['chart_cache']['misses']:
+        raise SystemExit("Icon handle soak check FAILED")
+    print("Icon handle soak check: ok")
+
+
+if __name__ == '__main__':
+    main()
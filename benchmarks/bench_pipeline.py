@@ -0,0 +1,92 @@
+"""Benchmark the fetch -> decode -> extract -> format -> render -> display pipeline without Windows.
+
+Drives SystemTray against a local stub API with a recording fake of Shell_NotifyIconW and reports
+per-stage latency percentiles, icon updates per second and RSS growth for 1, 10 and 100 icons.
+
+    python benchmarks/bench_pipeline.py [--polls N] [--icons 1 10 100] [--change-ratio R] [--renderer glyph]
+"""
+import time
+import argparse
+
+import harness
+import fake_win32
+
+
+def run(icon_count: int, polls: int, change_ratio: float, value_range: int, font_path: str = None,
+        extra_env: dict = None) -> dict:
+    """Run the pipeline for a number of polls and return the measurements."""
+    handles_before = len(fake_win32.handles.live)
+    with harness.StubApi(icon_count, change_ratio, value_range) as stub:
+        app = harness.create_app(icon_count, stub.url, font_path, extra_env)
+        import systray
+
+        timer = harness.StageTimer()
+        source = app.sources['default']
+        client = source['client']
+        source['extractor'].extract = timer.wrap('extract', source['extractor'].extract)
+        app.format_value = timer.wrap('format', app.format_value)
+        app.create_icon_from_text = timer.wrap('render', app.create_icon_from_text)
+        original_shell = systray.Shell_NotifyIconW
+        systray.Shell_NotifyIconW = timer.wrap('display', original_shell)
+        fake_win32.shell.reset()
+
+        try:
+            # Warm up connections, fonts and caches before measuring memory
+            for _ in range(min(50, polls)):
+                app.apply_data('default', client.fetch().json())
+            rss_start = harness.rss_bytes()
+            applied_start = app.update_stats['applied']
+            timer.samples.clear()
+
+            start = time.perf_counter()
+            for _ in range(polls):
+                poll_start = time.perf_counter()
+                result = timer.wrap('fetch', client.fetch)()
+                if not (result.not_modified or result.unchanged):
+                    data = timer.wrap('decode', result.json)()
+                    app.apply_data('default', data)
+                timer.add('poll', time.perf_counter() - poll_start)
+            elapsed = time.perf_counter() - start
+        finally:
+            systray.Shell_NotifyIconW = original_shell
+            client.close()
+
+        applied = app.update_stats['applied'] - applied_start
+        return {
+            'icons': icon_count,
+            'polls': polls,
+            'elapsed': elapsed,
+            'updates_per_second': applied / elapsed if elapsed else 0.0,
+            'polls_per_second': polls / elapsed if elapsed else 0.0,
+            'rss_growth': harness.rss_bytes() - rss_start,
+            'stages': timer.summary(),
+            'update_stats': dict(app.update_stats),
+            'icon_cache': app.icon_cache.stats(),
+            'live_handles': len(fake_win32.handles.live) - handles_before,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--polls', type=int, default=2000, help='polls per configuration')
+    parser.add_argument('--icons', type=int, nargs='+', default=[1, 10, 100], help='icon counts to run')
+    parser.add_argument('--change-ratio', type=float, default=0.5,
+                        help='fraction of values that change between polls')
+    parser.add_argument('--value-range', type=int, default=1000, help='number of distinct values per icon')
+    parser.add_argument('--font', help='TrueType font to render with')
+    parser.add_argument('--renderer', default='pillow', choices=['pillow', 'glyph'], help='icon renderer')
+    args = parser.parse_args()
+
+    for icon_count in args.icons:
+        result = run(icon_count, args.polls, args.change_ratio, args.value_range, args.font,
+                     {'RENDERER': args.renderer})
+        harness.print_table(f"\n{icon_count} icon(s), {result['polls']} polls in {result['elapsed']:.2f}s:",
+                            result['stages'])
+        print(f"  icon updates/s: {result['updates_per_second']:.0f}, polls/s: {result['polls_per_second']:.0f}")
+        print(f"  RSS growth: {result['rss_growth'] / 1024:.0f} KiB, live icon handles: {result['live_handles']}")
+        print(f"  update stats: {result['update_stats']}")
+        print(f"  icon cache: {result['icon_cache']}")
+
+
+if __name__ == '__main__':
+    main()
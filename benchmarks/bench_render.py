@@ -0,0 +1,83 @@
+"""Compare the Pillow and glyph renderers on render time and output.
+
+Renders random values for a few labels with each renderer, bypassing the icon cache, and reports
+per-icon latency percentiles, the speedup of the glyph renderer and the number of icons and pixels
+whose output differs from Pillow's.
+
+    python benchmarks/bench_render.py [--renders N] [--font PATH] [--label-size N] [--value-size N]
+"""
+import time
+import random
+import argparse
+
+import harness
+from icon_renderer import PillowRenderer, rgba_to_dib
+from glyph_renderer import GlyphRenderer
+
+LABELS = ['PV', 'DESK', 'TEMP', 'W', 'kWh']
+
+
+def random_values(count: int, seed: int = 1) -> list:
+    """Return (label, value) pairs with values formatted like the tray shows them."""
+    rng = random.Random(seed)
+    return [(rng.choice(LABELS), str(rng.randrange(-999, 10000))) for _ in range(count)]
+
+
+def time_renders(renderer, pairs) -> list:
+    """Render every pair and return the duration of each render in seconds."""
+    samples = []
+    for label, value in pairs:
+        start = time.perf_counter()
+        renderer.render(label, value)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def compare(reference, candidate, pairs) -> dict:
+    """Count the icons and pixels where the candidate's output differs from the reference."""
+    icons = pixels = max_difference = 0
+    for label, value in pairs:
+        expected = reference.draw(label, value)
+        actual = candidate.draw(label, value)
+        if expected == actual:
+            continue
+        icons += 1
+        differences = [abs(a - b) for a, b in zip(expected[3::4], actual[3::4]) if a != b]
+        pixels += len(differences)
+        max_difference = max([max_difference] + differences)
+    return {'icons': icons, 'pixels': pixels, 'max_alpha_difference': max_difference}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--renders', type=int, default=5000, help='icons rendered per renderer')
+    parser.add_argument('--font', help='TrueType font to render with')
+    parser.add_argument('--label-size', type=int, default=13, help='label font size')
+    parser.add_argument('--value-size', type=int, default=17, help='value font size')
+    args = parser.parse_args()
+
+    font_path = args.font or harness.default_font()
+    pillow = PillowRenderer(font_path, args.label_size, args.value_size)
+    glyph = GlyphRenderer(font_path, args.label_size, args.value_size)
+    pairs = random_values(args.renders)
+
+    # Warm up fonts and the glyph atlas
+    time_renders(pillow, pairs[:100])
+    time_renders(glyph, pairs[:100])
+
+    results = {
+        'pillow': harness.percentiles(time_renders(pillow, pairs)),
+        'glyph': harness.percentiles(time_renders(glyph, pairs)),
+    }
+    harness.print_table(f"{args.renders} renders with {font_path}:", results)
+    print(f"  glyph speedup (p50): {results['pillow']['p50'] / results['glyph']['p50']:.1f}x")
+
+    mismatched = compare(pillow, glyph, pairs)
+    print(f"  differing icons: {mismatched['icons']} of {len(pairs)}, differing pixels: {mismatched['pixels']}, "
+          f"max alpha difference: {mismatched['max_alpha_difference']}")
+    if rgba_to_dib(glyph.draw(*pairs[0])) != glyph.render(*pairs[0]):
+        print("  warning: the glyph renderer's DIB encoding differs from rgba_to_dib")
+
+
+if __name__ == '__main__':
+    main()
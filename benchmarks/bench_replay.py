@@ -0,0 +1,134 @@
+"""Record the responses of a stub API through the update loop, then replay the log without the network.
+
+Records for a few seconds polling at a short fixed interval, so the log has bodies as well as unchanged
+responses, replays it into a fresh application at full speed and at an accelerated speed, and checks that
+the replays end with the icon values the recording ended with and that the accelerated replay keeps the
+recorded pace, unless the pipeline is too slow for it. Also checks that a log recorded on a warm start,
+with a snapshot of the same values, still replays without that snapshot.
+
+    python benchmarks/bench_replay.py [--icons N] [--duration S] [--interval S] [--speed N]
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import threading
+
+import harness
+from recording import read_responses
+
+
+def record(path: str, stub: harness.StubApi, duration: float, interval: float, extra_env: dict = None) -> dict:
+    """Run the update loop against the stub API with a response log and return the final icon values."""
+    requests_before = stub.requests
+    app = harness.create_app(stub.icon_count, stub.url, extra_env=extra_env, record_file=path)
+    scheduler = app.sources['default']['scheduler']
+    thread = threading.Thread(target=app.update_loop, args=('default',), daemon=True)
+    thread.start()
+    # Poll at a fixed rate, as with "Refresh now", rather than the adaptive interval
+    end = time.time() + duration
+    while time.time() < end:
+        time.sleep(interval)
+        scheduler.wake()
+    app.running = False
+    scheduler.wake()
+    thread.join(10)
+    app.cleanup()
+    return {
+        'requests': stub.requests - requests_before,
+        'stats': dict(app.recorder.stats),
+        'values': {icon_id: icon_info.value for icon_id, icon_info in app.icons.items()},
+    }
+
+
+def replay(path: str, icon_count: int, speed: float) -> dict:
+    """Replay a response log into a fresh application and return the counts, timing and final icon values."""
+    app = harness.create_app(icon_count, 'http://127.0.0.1:9/')  # Never fetched
+    app.replay_file = path
+    app.replay_speed = speed
+    applied_start = app.update_stats['applied']
+    start = time.perf_counter()
+    counts = app.replay_loop()
+    elapsed = time.perf_counter() - start
+    return {
+        'counts': counts,
+        'elapsed': elapsed,
+        'updates': app.update_stats['applied'] - applied_start,
+        'values': {icon_id: icon_info.value for icon_id, icon_info in app.icons.items()},
+    }
+
+
+def check_snapshot(directory: str, icon_count: int):
+    """Record twice from an API that never changes, the second time on a warm start, and replay the second log."""
+    env = {'SNAPSHOT_FILE': os.path.join(directory, 'snapshot.json')}
+    path = os.path.join(directory, 'warm.log')
+    with harness.StubApi(icon_count, 0.0) as stub:
+        record(os.path.join(directory, 'cold.log'), stub, 0.3, 0.05, env)
+        recorded = record(path, stub, 0.3, 0.05, env)
+    kinds = [response.kind for response in read_responses(path)]
+    result = replay(path, icon_count, 0.0)
+    assert kinds and kinds[0] == 'body', kinds
+    assert result['values'] == recorded['values'], (result['values'], recorded['values'])
+    return kinds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--icons', type=int, default=20, help='icons, one value each in the document')
+    parser.add_argument('--duration', type=float, default=4.0, help='seconds to record')
+    parser.add_argument('--interval', type=float, default=0.02, help='poll interval while recording')
+    parser.add_argument('--padding', type=int, default=20000, help='extra bytes per document')
+    parser.add_argument('--speed', type=float, default=4.0, help='speed of the paced replay')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix='systray-replay-')
+    try:
+        path = os.path.join(directory, 'responses.log')
+        with harness.StubApi(args.icons, 0.05, padding=args.padding) as stub:
+            recorded = record(path, stub, args.duration, args.interval)
+        responses = list(read_responses(path))
+        kinds = {}
+        for response in responses:
+            kinds[response.kind] = kinds.get(response.kind, 0) + 1
+        span = responses[-1].timestamp + responses[-1].latency - responses[0].timestamp - responses[0].latency
+        stats = recorded['stats']
+        print(f"Recorded {len(responses)} responses of {recorded['requests']} requests over {span:.2f}s: {kinds}")
+        print(f"  log size: {stats['bytes'] / 1024:.0f} KiB for {stats['body_bytes'] / 1024:.0f} KiB of bodies "
+              f"({stats['bytes'] / max(1, stats['body_bytes']):.1%})")
+
+        failed = False
+        full_speed = None
+        for speed in (0.0, args.speed):
+            result = replay(path, args.icons, speed)
+            counts = result['counts']
+            label = f"{speed:g}x speed" if speed else "full speed"
+            print(f"\nReplay at {label}: {counts['replayed']} responses in {result['elapsed']:.2f}s, "
+                  f"{counts['changed']} with changes, {result['updates']} icon updates")
+            if speed:
+                # A pipeline slower than the pace falls behind, but never runs ahead of it
+                expected = span / speed
+                print(f"  duration {result['elapsed']:.2f}s, recorded pace {expected:.2f}s, "
+                      f"full speed replay {full_speed:.2f}s")
+                if not expected - 0.05 <= result['elapsed'] <= max(expected, full_speed) + 0.1 + 0.05 * expected:
+                    print("  pace check FAILED")
+                    failed = True
+            else:
+                full_speed = result['elapsed']
+                print(f"  {counts['replayed'] / result['elapsed']:.0f} responses/s, "
+                      f"{result['updates'] / result['elapsed']:.0f} icon updates/s")
+            if counts['replayed'] != len(responses) or counts['errors'] or result['values'] != recorded['values']:
+                print(f"  replay check FAILED: {counts}")
+                failed = True
+        if failed:
+            raise SystemExit("Replay check FAILED")
+        kinds = check_snapshot(directory, args.icons)
+        print(f"\nWarm start log replayed without the snapshot: ok ({kinds.count('body')} body, "
+              f"{kinds.count('unchanged')} unchanged)")
+        print("\nReplay check: ok")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Check the poll scheduler's intervals, backoff and jitter deterministically, with a fake clock and seeded rng.
+
+Checks that the interval shrinks while values change and grows while they do not, within its min and max,
+that the delay after failures doubles up to the maximum backoff and resets after a success, that jitter
+stays within its bounds and repeats for the same seed, and that wait() follows the fake clock. Then prints
+the delays of a simulated source that goes through an outage.
+
+    python benchmarks/bench_scheduler.py [--seed N] [--samples N]
+"""
+import random
+import argparse
+
+import harness  # noqa: F401 (puts the application modules on the path)
+from scheduler import PollScheduler
+
+
+class FakeClock:
+    """Monotonic clock that only moves when advanced."""
+
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+def check_intervals():
+    """Check that the interval halves while values change and grows by half while they do not."""
+    scheduler = PollScheduler(30, min_interval=5, max_interval=100, jitter=0, clock=FakeClock())
+    intervals = []
+    for changed in [True] * 4 + [False] * 6:
+        scheduler.record_success(changed)
+        intervals.append(scheduler.base_delay())
+    assert intervals == [15, 7.5, 5, 5, 7.5, 11.25, 16.875, 25.3125, 37.96875, 56.953125], intervals
+    for _ in range(10):
+        scheduler.record_success(False)
+    assert scheduler.base_delay() == 100
+    # Limits on the wrong side of the interval are moved to it
+    scheduler = PollScheduler(30, min_interval=60, max_interval=10, jitter=0)
+    assert (scheduler.min_interval, scheduler.max_interval) == (30, 30)
+
+
+def check_backoff():
+    """Check that the delay after failures doubles up to max_backoff and resets after a success."""
+    scheduler = PollScheduler(30, error_delay=5, max_backoff=60, jitter=0, clock=FakeClock())
+    delays = []
+    for _ in range(6):
+        scheduler.record_failure()
+        delays.append(scheduler.next_delay())
+    assert delays == [5, 10, 20, 40, 60, 60], delays
+    scheduler.record_success(False)
+    assert scheduler.failures == 0 and scheduler.next_delay() == 30  # Back to the interval, capped at max
+    # The maximum backoff is never below the first error delay
+    assert PollScheduler(30, error_delay=5, max_backoff=1).max_backoff == 5
+
+
+def check_jitter(seed: int, samples: int):
+    """Check that jittered delays stay within their bounds and repeat for the same seed."""
+    def delays(seed):
+        scheduler = PollScheduler(30, jitter=0.1, clock=FakeClock(), rng=random.Random(seed))
+        result = []
+        for i in range(samples):
+            if i % 7 == 3:
+                scheduler.record_failure()
+            else:
+                scheduler.record_success(i % 3 == 0)
+            base = scheduler.base_delay()
+            delay = scheduler.next_delay()
+            assert base * 0.9 <= delay <= base * 1.1, (base, delay)
+            result.append(delay)
+        # An explicit base, as stream_loop passes the server's retry delay, is jittered the same way
+        delay = scheduler.next_delay(2.0)
+        assert 1.8 <= delay <= 2.2, delay
+        return result
+
+    first = delays(seed)
+    assert first == delays(seed), "same seed, different delays"
+    assert first != delays(seed + 1), "different seeds, same delays"
+    return min(first), max(first)
+
+
+def check_wait():
+    """Check that remaining() and wait() follow the fake clock and that wake() interrupts a wait."""
+    clock = FakeClock()
+    scheduler = PollScheduler(30, jitter=0, clock=clock)
+    assert scheduler.remaining() == 0.0
+    scheduler.next_delay()
+    assert scheduler.remaining() == 30
+    clock.advance(12.5)
+    assert scheduler.remaining() == 17.5
+    scheduler.wake()
+    assert scheduler.wait() is True  # Woken, without waiting for the deadline
+    clock.advance(20)
+    assert scheduler.remaining() == 0.0
+    assert scheduler.wait() is False  # Deadline passed on the fake clock, returns right away
+
+
+def simulate(seed: int) -> list:
+    """Return (time, outcome, delay) for a source that changes, settles, fails for a while and recovers."""
+    clock = FakeClock(0.0)
+    scheduler = PollScheduler(30, min_interval=10, max_interval=120, error_delay=5, max_backoff=300,
+                              jitter=0.1, clock=clock, rng=random.Random(seed))
+    outcomes = ['changed'] * 3 + ['same'] * 5 + ['error'] * 8 + ['changed'] * 2 + ['same'] * 2
+    timeline = []
+    for outcome in outcomes:
+        if outcome == 'error':
+            scheduler.record_failure()
+        else:
+            scheduler.record_success(outcome == 'changed')
+        delay = scheduler.next_delay()
+        timeline.append((clock(), outcome, delay))
+        clock.advance(delay)
+    return timeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seed', type=int, default=1, help='seed of the jitter random generator')
+    parser.add_argument('--samples', type=int, default=10000, help='jittered delays to check')
+    args = parser.parse_args()
+
+    check_intervals()
+    print("Adaptive interval within min and max: ok")
+    check_backoff()
+    print("Exponential backoff up to max_backoff, reset after success: ok")
+    low, high = check_jitter(args.seed, args.samples)
+    print(f"Jitter within +/-10% and repeatable for seed {args.seed}: ok "
+          f"({args.samples} delays, {low:.2f}-{high:.2f}s)")
+    check_wait()
+    print("Deadline and wait() on a fake clock: ok")
+
+    print(f"\nSimulated source (interval 30s, 10-120s, backoff 5-300s, jitter 10%, seed {args.seed}):")
+    print(f"  {'time s':>8} {'poll':>8} {'next in s':>10}")
+    for at, outcome, delay in simulate(args.seed):
+        print(f"  {at:>8.1f} {outcome:>8} {delay:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Run several instances as separate processes against a stub API, with and without the shared fetch cache.
+
+Each process polls with its own client, as an instance in another session would. Without sharing every
+process requests the API; with SharedApiClient one process fetches and publishes, the others read the
+cache file. Part way through, the fetching process is killed to check that another one takes over and
+that no process ever uses data older than the cache's maximum age.
+
+    python benchmarks/bench_shared_cache.py [--instances N] [--interval S] [--duration S] [--kill-after S]
+"""
+import json
+import time
+import queue
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+import harness
+
+
+def worker(index: int, url: str, directory: str, interval: float, duration: float, max_age: float, events):
+    """Poll like an update loop and report role changes, the age of the data seen and the client counters."""
+    from api_client import ApiClient
+    from shared_cache import SharedApiClient
+
+    if directory:
+        client = SharedApiClient(url, directory=directory, max_age=max_age)
+    else:
+        client = ApiClient(url)
+    rng = random.Random(index)
+    generated = None
+    max_data_age = 0.0
+    polls = 0
+    fetcher = False
+    end = time.time() + duration
+    while time.time() < end:
+        result = client.fetch()
+        now = time.time()
+        if result.content:
+            generated = json.loads(result.content)['generated']
+        if generated is not None:
+            max_data_age = max(max_data_age, now - generated)
+        if getattr(client, 'fetcher', False) != fetcher:
+            fetcher = not fetcher
+            events.put(('role', index, fetcher, now))
+        polls += 1
+        time.sleep(interval * rng.uniform(0.9, 1.1))
+    events.put(('done', index, polls, max_data_age, dict(client.stats)))
+    client.close()
+
+
+def run(instances: int, interval: float, duration: float, kill_after: float, shared: bool) -> dict:
+    """Run the instances for a while, killing the fetching one if shared, and collect their reports."""
+    context = multiprocessing.get_context('spawn')
+    events = context.Queue()
+    directory = tempfile.mkdtemp(prefix='systray-shared-') if shared else None
+    max_age = 2 * interval * 1.1 + 0.5
+    fetchers = []  # (time, index) each time an instance became the fetcher
+    killed = None
+    reports = {}
+    try:
+        with harness.StubApi(10, 1.0, timestamp=True) as stub:
+            processes = [context.Process(target=worker, args=(i, stub.url, directory, interval, duration, max_age,
+                                                               events))
+                         for i in range(instances)]
+            for process in processes:
+                process.start()
+            start = time.time()
+            deadline = start + duration + 30
+            while len(reports) < instances - (killed is not None) and time.time() < deadline:
+                if shared and killed is None and fetchers and time.time() - start >= kill_after:
+                    killed = (time.time(), fetchers[-1][1])
+                    processes[killed[1]].terminate()  # No cleanup: the OS has to release the lock
+                try:
+                    event = events.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if event[0] == 'role' and event[2]:
+                    fetchers.append((event[3], event[1]))
+                elif event[0] == 'done':
+                    reports[event[1]] = event[2:]
+            for process in processes:
+                process.join(5)
+            requests = stub.requests
+    finally:
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    takeover = None
+    if killed:
+        later = [at for at, index in fetchers if at > killed[0]]
+        takeover = later[0] - killed[0] if later else None
+    return {
+        'requests': requests,
+        'polls': sum(polls for polls, _, _ in reports.values()),
+        'max_data_age': max(age for _, age, _ in reports.values()),
+        'max_age': max_age,
+        'fetchers': [index for _, index in fetchers],
+        'takeover': takeover,
+        'direct': sum(stats.get('direct', 0) for _, _, stats in reports.values()),
+        'shared_reads': sum(stats.get('shared_reads', 0) for _, _, stats in reports.values()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--instances', type=int, default=8, help='instance processes')
+    parser.add_argument('--interval', type=float, default=0.2, help='poll interval in seconds')
+    parser.add_argument('--duration', type=float, default=6.0, help='seconds each instance polls')
+    parser.add_argument('--kill-after', type=float, default=2.0, help='seconds until the fetching instance is killed')
+    args = parser.parse_args()
+
+    for shared in (False, True):
+        result = run(args.instances, args.interval, args.duration, args.kill_after, shared)
+        print(f"{args.instances} instances polling every {args.interval:g}s for {args.duration:g}s, "
+              f"{'shared cache' if shared else 'no sharing'}:")
+        print(f"  API requests: {result['requests']} for {result['polls']} polls")
+        print(f"  oldest data used: {result['max_data_age']:.2f}s")
+        if shared:
+            takeover = f"{result['takeover']:.2f}s" if result['takeover'] is not None else 'none'
+            print(f"  shared reads: {result['shared_reads']}, direct fetches: {result['direct']}, "
+                  f"fetchers in turn: {result['fetchers']}, takeover after kill: {takeover}")
+            if result['takeover'] is None or result['max_data_age'] > result['max_age']:
+                raise SystemExit(f"Shared cache check FAILED (maximum age {result['max_age']:.2f}s)")
+            print(f"Shared cache check: ok (maximum age {result['max_age']:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Measure the history ring buffer and the sparkline renderer without Windows.
+
+Appends samples to a History far beyond its capacity to check that memory stays constant, then
+times downsampling and rendering a sparkline for several history sizes. With --output the last
+icon is also written to an ICO file for inspection.
+
+    python benchmarks/bench_sparkline.py [--appends N] [--renders N] [--sizes 60 240 1000] [--output FILE]
+"""
+import math
+import time
+import argparse
+import tracemalloc
+
+import harness
+from history import History
+from sparkline import SparklineRenderer
+
+
+def fill(history: History, count: int, start: float = 0.0, step: float = 15.0):
+    """Append count samples of a slow sine wave, step seconds apart."""
+    for i in range(count):
+        history.append(start + i * step, 500 + 400 * math.sin(i / 20))
+
+
+def measure_appends(capacity: int, appends: int) -> dict:
+    """Return the time per append and the memory allocated while appending far more samples than fit."""
+    history = History(capacity)
+    fill(history, capacity)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    fill(history, appends, start=capacity * 15.0)
+    elapsed = time.perf_counter() - start
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return {'per_append': elapsed / appends, 'memory_growth': growth, 'samples': len(history)}
+
+
+def measure_renders(renderer: SparklineRenderer, capacity: int, renders: int, window: float) -> dict:
+    """Time chart() and render() on a full history of the given capacity."""
+    history = History(capacity)
+    fill(history, capacity)
+    now = history.latest()[0]
+    timer = harness.StageTimer()
+    chart = None
+    for i in range(renders):
+        timestamps, values = timer.wrap('samples', history.samples)()
+        chart = timer.wrap('chart', renderer.chart)(timestamps, values, now + i, window)
+        timer.wrap('render', renderer.render)('PV', chart)
+    return {'stages': timer.summary(), 'chart': chart}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--appends', type=int, default=200000, help='samples appended to a full history')
+    parser.add_argument('--renders', type=int, default=2000, help='sparklines rendered per history size')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[60, 240, 1000], help='history sizes to run')
+    parser.add_argument('--window', type=float, default=3600, help='sparkline window in seconds')
+    parser.add_argument('--font', help='TrueType font to render the label with')
+    parser.add_argument('--output', help='write the last sparkline to this ICO file')
+    args = parser.parse_args()
+
+    renderer = SparklineRenderer(args.font or harness.default_font(), 13)
+    chart = None
+    for capacity in args.sizes:
+        appends = measure_appends(capacity, args.appends)
+        print(f"\nHistory of {capacity} samples: {appends['per_append'] * 1e6:.2f} us per append, "
+              f"{appends['memory_growth']} bytes allocated over {args.appends} appends, "
+              f"{appends['samples']} samples kept")
+        result = measure_renders(renderer, capacity, args.renders, args.window)
+        harness.print_table(f"Sparkline over {args.window:g}s:", result['stages'])
+        chart = result['chart']
+
+    if args.output and chart is not None:
+        with open(args.output, 'wb') as f:
+            f.write(renderer.render_ico('PV', chart))
+        print(f"\nWrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
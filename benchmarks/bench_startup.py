@@ -0,0 +1,62 @@
+"""Measure the import and initialization phases of systray.py on any platform.
+
+Runs `import systray` in fresh interpreters with the Windows modules replaced by fakes and
+reports the median time of each phase recorded by startup_profile, plus the modules that
+were (not) loaded at import time.
+
+    python benchmarks/bench_startup.py [--runs N]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import sys, time, json
+start = time.perf_counter()
+sys.path[:0] = [{root!r}, {benchmarks!r}]
+import fake_win32
+fake_win32.install()
+import systray
+total = time.perf_counter() - start
+lazy = ['requests', 'watchdog', 'winshell', 'win32com.client']
+print(json.dumps({{
+    'phases': systray.profile.phases,
+    'total': total,
+    'loaded': [name for name in lazy
+               if name in sys.modules and not isinstance(sys.modules[name], fake_win32.FakeModule)],
+}}))
+'''
+
+
+def run_once() -> dict:
+    code = CHILD.format(root=ROOT, benchmarks=os.path.join(ROOT, 'benchmarks'))
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10, help='number of fresh interpreters to start')
+    args = parser.parse_args()
+
+    results = [run_once() for _ in range(args.runs)]
+    phases = {}
+    for result in results:
+        for name, seconds in result['phases']:
+            phases.setdefault(name, []).append(seconds)
+
+    print(f"Import phases of systray.py, median of {args.runs} runs:")
+    for name, samples in phases.items():
+        print(f"  {name:<32} {statistics.median(samples) * 1000:8.1f} ms")
+    print(f"  {'total import':<32} {statistics.median(r['total'] for r in results) * 1000:8.1f} ms")
+    loaded = sorted(set(name for result in results for name in result['loaded']))
+    print(f"Deferred modules loaded at import time: {', '.join(loaded) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""Check stream mode against a local server sending Server-Sent Events in chunks.
+
+The server starts each connection with a block holding only a `retry` field, sends a few events with
+increasing ids and then ends the stream. Checks the SSE parser on its own, then that StreamClient takes
+the retry delay, reconnects with Last-Event-ID and receives every event exactly once, and finally that
+SystemTray.stream_loop waits the retry delay between connections and shows the last value.
+
+    python benchmarks/bench_stream.py [--events N] [--per-connection N] [--retry MS]
+"""
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler
+
+import harness
+from stream_client import StreamClient, parse_sse
+
+
+class SseStub:
+    """Local server streaming events {"values": {"v0": n}} with id n, `per_connection` per connection.
+
+    Resumes after the Last-Event-ID sent by the client and records the header and time of each connection.
+    """
+
+    def __init__(self, events: int, per_connection: int, retry_ms: int, pause: float = 0.005):
+        self.events = events
+        self.per_connection = per_connection
+        self.retry_ms = retry_ms
+        self.pause = pause  # Between events, so they arrive in separate chunks
+        self.connections = []  # (Last-Event-ID or None, connected at, ended at)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def chunk(self, text: str):
+                data = text.encode('utf-8')
+                self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+                self.wfile.flush()
+
+            def do_GET(self):
+                last_id = self.headers.get('Last-Event-ID')
+                connected = time.time()
+                first = int(last_id) + 1 if last_id else 1
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                self.chunk(f'retry: {stub.retry_ms}\n\n: heartbeat\n\n')
+                for n in range(first, min(first + stub.per_connection, stub.events + 1)):
+                    time.sleep(stub.pause)
+                    self.chunk(f'id: {n}\ndata: {{"values":\ndata: {{"v0": {n}}}}}\n\n')
+                self.wfile.write(b'0\r\n\r\n')
+                self.wfile.flush()
+                stub.connections.append((last_id, connected, time.time()))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = harness.QuietServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_port}/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def check_parse():
+    """Check the parser on blocks with only a retry or id field, comments, multi-line data and a cut last block."""
+    assert list(parse_sse(['retry: 2500', '', 'data: 1', ''])) == [(None, None, 2.5), (None, '1', None)]
+    assert list(parse_sse(['id: 7', '', 'data: 1', ''])) == [('7', None, None), ('7', '1', None)]
+    assert list(parse_sse([': ping', '', 'id: 3', 'data: a', 'data: b', '', 'data: c', ''])) == \
+        [('3', 'a\nb', None), ('3', 'c', None)]
+    assert list(parse_sse(['data: 1', 'retry: soon', ''])) == [(None, '1', None)]
+    assert list(parse_sse(['data: 1', '', 'id: 2', 'data: 2'])) == [(None, '1', None)]  # Cut before its blank line
+
+
+def check_client(events: int, per_connection: int, retry_ms: int):
+    """Read the whole stream with StreamClient, reconnecting after each end of stream."""
+    with SseStub(events, per_connection, retry_ms) as stub:
+        client = StreamClient(stub.url)
+        received = []
+        try:
+            while len(received) < events and len(stub.connections) <= events:
+                for document in client.events():
+                    received.append(document['values']['v0'])
+        finally:
+            client.close()
+        assert received == list(range(1, events + 1)), received
+        assert client.retry_delay == retry_ms / 1000, client.retry_delay
+        expected_ids = [None] + [str(n) for n in range(per_connection, events, per_connection)]
+        assert [last_id for last_id, _, _ in stub.connections] == expected_ids, stub.connections
+        return client.connection_stats()
+
+
+def check_loop(events: int, per_connection: int, retry_ms: int) -> dict:
+    """Run stream_loop until the icon shows the last event and return the reconnect gaps."""
+    with SseStub(events, per_connection, retry_ms) as stub:
+        app = harness.create_app(1, stub.url, extra_env={'API_MODE': 'stream'})
+        source = app.sources['default']
+        thread = threading.Thread(target=app.stream_loop, args=('default',), daemon=True)
+        thread.start()
+        deadline = time.time() + 10 + events / per_connection * retry_ms / 1000 * 2
+        while app.icons['V0_values.v0'].value != str(events) and time.time() < deadline:
+            time.sleep(0.01)
+        app.stop_updates()
+        thread.join(5)
+        value = app.icons['V0_values.v0'].value
+        assert value == str(events), value
+        connections = stub.connections
+        gaps = [connections[i + 1][1] - connections[i][2] for i in range(len(connections) - 1)]
+        jitter = source['config']['poll_jitter']
+        retry = retry_ms / 1000
+        assert all(retry * (1 - jitter) - 0.01 <= gap <= retry * (1 + jitter) + 0.1 for gap in gaps), gaps
+        return {'connections': len(connections), 'gaps': gaps}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=20, help='events in the whole stream')
+    parser.add_argument('--per-connection', type=int, default=5, help='events before the server ends the stream')
+    parser.add_argument('--retry', type=int, default=200, help='reconnect delay the server asks for, in ms')
+    args = parser.parse_args()
+
+    check_parse()
+    print("SSE parser: ok")
+    stats = check_client(args.events, args.per_connection, args.retry)
+    print(f"StreamClient resume with Last-Event-ID and retry: ok {stats}")
+    result = check_loop(args.events, args.per_connection, args.retry)
+    gaps = ', '.join(f'{gap * 1000:.0f}' for gap in result['gaps'])
+    print(f"stream_loop: ok, {result['connections']} connections, reconnect gaps {gaps} ms "
+          f"for a retry of {args.retry} ms")
+
+
+if __name__ == '__main__':
+    main()
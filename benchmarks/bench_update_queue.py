@@ -0,0 +1,184 @@
+"""Check and measure the coalescing update queue between the update threads and the message loop.
+
+Bursty producer threads put increasing values per key while a consumer, woken like the message
+loop by a posted message, drains the queue, optionally pausing to simulate a menu being open.
+Verifies that every key's values arrive in order, that the last value of every key arrives and
+that no wake-up is lost, then runs the same through SystemTray.wnd_proc with a fake message pump.
+
+    python benchmarks/bench_update_queue.py [--producers N] [--keys N] [--bursts N] [--stall MS]
+"""
+import time
+import random
+import argparse
+import threading
+
+import harness
+from update_queue import CoalescingQueue
+
+
+class MessagePump:
+    """Consumer thread standing in for the message loop: waits for a posted message, then drains."""
+
+    def __init__(self, handle, stall: float = 0.0):
+        self.handle = handle  # Called with nothing, like the window procedure for the posted message
+        self.stall = stall
+        self.posted = threading.Event()
+        self.running = True
+        self.messages = 0
+        self.thread = threading.Thread(target=self.loop, daemon=True)
+
+    def post(self, *args):
+        self.posted.set()
+        return True
+
+    def loop(self):
+        while self.running or self.posted.is_set():
+            if not self.posted.wait(0.05):
+                continue
+            self.posted.clear()
+            self.messages += 1
+            if self.stall:
+                time.sleep(self.stall)  # A modal menu or a slow shell call blocks the loop for a while
+            self.handle()
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+
+
+def check_order():
+    """Check the drain order and coalescing of a simple sequence."""
+    queue = CoalescingQueue()
+    assert queue.put('a', 1) is True
+    assert queue.put('b', 1) is False
+    assert queue.put('a', 2) is False
+    assert queue.drain() == [('a', 2), ('b', 1)]
+    assert queue.drain() == []
+    assert queue.put('b', 2) is True
+    assert queue.stats() == {'pending': 1, 'puts': 4, 'coalesced': 1, 'drained': 2, 'wakeups': 2}
+
+
+def run_queue(producers: int, keys: int, bursts: int, burst_size: int, stall: float, seed: int = 1) -> dict:
+    """Run bursty producers against a draining consumer and verify what the consumer saw."""
+    queue = CoalescingQueue()
+    seen = {}  # Key -> values in the order they were applied
+    latencies = []
+
+    def apply():
+        now = time.perf_counter()
+        for key, (value, queued_at) in queue.drain():
+            seen.setdefault(key, []).append(value)
+            latencies.append(now - queued_at)
+
+    pump = MessagePump(apply, stall)
+    pump.thread.start()
+    last = {}
+
+    def produce(index: int):
+        rng = random.Random(seed + index)
+        # Each producer owns its keys, like a source owns its icons
+        own_keys = [key for key in range(keys) if key % producers == index]
+        value = 0
+        for _ in range(bursts):
+            for _ in range(burst_size):
+                value += 1
+                key = rng.choice(own_keys)
+                last[key] = value
+                if queue.put(key, (value, time.perf_counter())):
+                    pump.post()
+            time.sleep(rng.uniform(0, 0.002))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pump.stop()
+    elapsed = time.perf_counter() - start
+
+    out_of_order = sum(1 for values in seen.values() for a, b in zip(values, values[1:]) if b <= a)
+    missing = sum(1 for key, value in last.items() if not seen.get(key) or seen[key][-1] != value)
+    stats = queue.stats()
+    return {
+        'elapsed': elapsed,
+        'stats': stats,
+        'applied': sum(len(values) for values in seen.values()),
+        'messages': pump.messages,
+        'out_of_order': out_of_order,
+        'missing': missing,
+        'latency': harness.percentiles(latencies),
+    }
+
+
+def run_app(icon_count: int, producers: int, polls: int, stall: float) -> dict:
+    """Feed responses through SystemTray.apply_data on several threads with updates marshalled to a fake loop."""
+    with harness.StubApi(icon_count, 1.0) as stub:
+        app = harness.create_app(icon_count, stub.url)
+        import systray
+        source = app.sources['default']
+        documents = [source['client'].fetch().json() for _ in range(polls)]
+        source['client'].close()
+
+    pump = MessagePump(lambda: app.wnd_proc(app.hwnd, systray.WM_APPLY_UPDATES, 0, 0), stall)
+    original_post = systray.win32gui.PostMessage
+    systray.win32gui.PostMessage = pump.post
+    app.marshal_updates = True
+    pump.thread.start()
+    try:
+        def produce(index: int):
+            for document in documents[index::producers]:
+                app.apply_data('default', document)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=produce, args=(i,)) for i in range(producers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        pump.stop()
+        elapsed = time.perf_counter() - start
+    finally:
+        systray.win32gui.PostMessage = original_post
+
+    return {
+        'elapsed': elapsed,
+        'queue': app.update_queue.stats(),
+        'update_stats': dict(app.update_stats),
+        'messages': pump.messages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--producers', type=int, default=4, help='producer threads')
+    parser.add_argument('--keys', type=int, default=20, help='distinct keys (icons)')
+    parser.add_argument('--bursts', type=int, default=200, help='bursts per producer')
+    parser.add_argument('--burst-size', type=int, default=50, help='items per burst')
+    parser.add_argument('--stall', type=float, default=2.0, help='milliseconds the consumer blocks per message')
+    parser.add_argument('--polls', type=int, default=500, help='responses applied through SystemTray')
+    args = parser.parse_args()
+
+    check_order()
+    print("Drain order and coalescing: ok")
+
+    result = run_queue(args.producers, args.keys, args.bursts, args.burst_size, args.stall / 1000)
+    stats = result['stats']
+    print(f"\n{stats['puts']} puts from {args.producers} bursty producers in {result['elapsed']:.2f}s, "
+          f"consumer stalling {args.stall:g} ms per message:")
+    print(f"  applied: {result['applied']}, coalesced: {stats['coalesced']}, messages: {result['messages']}, "
+          f"wake-ups posted: {stats['wakeups']}")
+    print(f"  out of order: {result['out_of_order']}, keys missing their last value: {result['missing']}")
+    harness.print_table("  queue latency:", {'queued': result['latency']})
+    if result['out_of_order'] or result['missing'] or stats['pending']:
+        raise SystemExit("Coalescing queue check FAILED")
+
+    result = run_app(10, args.producers, args.polls, args.stall / 1000)
+    print(f"\n{args.polls} responses for 10 icons through SystemTray on {args.producers} threads "
+          f"in {result['elapsed']:.2f}s:")
+    print(f"  queue: {result['queue']}")
+    print(f"  update stats: {result['update_stats']}, messages: {result['messages']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Stand-ins for the Windows-only modules, so systray.py can be imported and driven on Linux."""
+import sys
+import types
+import ctypes
+
+
+class FakeFunction:
+    """A ctypes-style foreign function that accepts argtypes/restype and returns a fixed result."""
+
+    def __init__(self, name, result=1):
+        self.name = name
+        self.result = result
+        self.argtypes = None
+        self.restype = None
+
+    def __call__(self, *args):
+        return self.result
+
+
+class FakeLibrary:
+    """A ctypes library whose functions are created on first access."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, name):
+        function = FakeFunction(name)
+        setattr(self, name, function)
+        return function
+
+
+class RecordingShell(FakeFunction):
+    """Fake Shell_NotifyIconW that records (message, uID, hIcon, szTip) for every call."""
+
+    def __init__(self):
+        super().__init__('Shell_NotifyIconW')
+        self.calls = []
+        self.counts = {}
+
+    def __call__(self, message, nid_ref):
+        nid = getattr(nid_ref, '_obj', nid_ref)
+        self.calls.append((message, nid.uID, nid.hIcon, nid.szTip))
+        self.counts[message] = self.counts.get(message, 0) + 1
+        return 1
+
+    def reset(self):
+        self.calls.clear()
+        self.counts.clear()
+
+
+class HandleAllocator(FakeFunction):
+    """Fake CreateIconFromResourceEx that hands out icon handles and tracks how many are alive."""
+
+    def __init__(self):
+        super().__init__('CreateIconFromResourceEx')
+        self.next_handle = 0x10000
+        self.live = set()
+        self.double_frees = 0
+
+    def __call__(self, *args):
+        self.next_handle += 1
+        self.live.add(self.next_handle)
+        return self.next_handle
+
+    def destroy(self, handle):
+        if handle in self.live:
+            self.live.remove(handle)
+        else:
+            self.double_frees += 1
+        return 1
+
+
+# Shared fakes, available after install()
+shell = RecordingShell()
+handles = HandleAllocator()
+
+
+class FakeWindll:
+    def __getattr__(self, name):
+        library = FakeLibrary(name)
+        setattr(self, name, library)
+        return library
+
+
+class FakeModule(types.ModuleType):
+    """A module whose missing upper-case names are integer constants and other names are no-op functions."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self._next_constant = 0x1000
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if name.isupper():
+            self._next_constant += 1
+            value = self._next_constant
+        else:
+            value = FakeFunction(name)
+        setattr(self, name, value)
+        return value
+
+
+def install():
+    """Register the fake modules in sys.modules (and ctypes.windll) unless the real ones are available."""
+    try:
+        import win32gui  # noqa: F401
+        return False
+    except ImportError:
+        pass
+
+    win32gui = FakeModule('win32gui')
+    win32gui.WNDCLASS = types.SimpleNamespace
+    win32gui.DestroyIcon = handles.destroy
+    win32gui.GetMessage = FakeFunction('GetMessage', (0, None))
+    win32con = FakeModule('win32con')
+    win32con.WM_USER = 0x0400
+    win32api = FakeModule('win32api')
+    win32api.GetLastError = FakeFunction('GetLastError', 0)
+    winshell = FakeModule('winshell')
+    winshell.startup = FakeFunction('startup', '/nonexistent')
+    win32com = FakeModule('win32com')
+    win32com.client = FakeModule('win32com.client')
+
+    for module in (win32gui, win32con, win32api, winshell, win32com, win32com.client):
+        sys.modules[module.__name__] = module
+    if not hasattr(ctypes, 'windll'):
+        ctypes.windll = FakeWindll()
+    ctypes.windll.shell32.Shell_NotifyIconW = shell
+    ctypes.windll.user32.CreateIconFromResourceEx = handles
+    return True
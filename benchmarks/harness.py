@@ -0,0 +1,178 @@
+"""Shared pieces for the headless benchmarks: a stub API server, a fake tray app and timing helpers."""
+import os
+import sys
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fake_win32  # noqa: E402
+
+# Fonts tried in order when no font is given
+FONT_CANDIDATES = [
+    'C:\\Windows\\Fonts\\bahnschrift.ttf',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
+    '/Library/Fonts/Arial.ttf',
+]
+
+
+def default_font() -> str:
+    """Return the first available font, or a path that makes the renderer use Pillow's default font."""
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return path
+    return 'missing.ttf'
+
+
+class QuietServer(ThreadingHTTPServer):
+    """HTTP server that does not print clients closing a connection before reading the whole response."""
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubApi:
+    """Local HTTP server returning {"values": {"v0": ..., "v1": ...}} documents.
+
+    Each request changes roughly `change_ratio` of the values, drawn from `value_range`.
+    """
+
+    def __init__(self, icon_count: int, change_ratio: float = 1.0, value_range: int = 1000, seed: int = 1,
+                 padding: int = 0, timestamp: bool = False):
+        self.icon_count = icon_count
+        self.change_ratio = change_ratio
+        self.value_range = value_range
+        self.padding = padding  # Extra unrelated bytes per document, to simulate larger payloads
+        self.timestamp = timestamp  # Add the time the document was generated as "generated"
+        self.rng = random.Random(seed)
+        self.values = {f'v{i}': self.rng.randrange(value_range) for i in range(icon_count)}
+        self.requests = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True  # Headers and body are written separately
+
+            def do_GET(self):
+                body = stub.next_body()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = QuietServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server.server_port}/'
+
+    def next_body(self) -> bytes:
+        with self.lock:
+            self.requests += 1
+            for key in self.values:
+                if self.rng.random() < self.change_ratio:
+                    self.values[key] = self.rng.randrange(self.value_range)
+            document = {'values': self.values}
+            if self.timestamp:
+                document['generated'] = time.time()
+            if self.padding:
+                document['padding'] = 'x' * self.padding
+            return json.dumps(document).encode()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def create_app(icon_count: int, url: str, font_path: str = None, extra_env: dict = None, **options):
+    """Create a SystemTray with fake Windows modules and icons ICON_V<i>=values.v<i>, ready for updates.
+
+    Keyword options are passed on to SystemTray, e.g. record_file.
+    """
+    fake_win32.install()
+    import systray
+    from config import load_config
+
+    environ = {'API_URL': url, 'FONT_PATH': font_path or default_font(), 'SNAPSHOT_FILE': ''}
+    environ.update({f'ICON_V{i}': f'values.v{i}' for i in range(icon_count)})
+    environ.update(extra_env or {})
+    config = load_config(environ)
+
+    app = systray.SystemTray(config, **options)
+    for label, path, source in config['icons']:
+        app.create_icon(label, path, source)
+    app.icons_ready.set()
+    app.running = True
+    return app
+
+
+class StageTimer:
+    """Collects duration samples per named stage."""
+
+    def __init__(self):
+        self.samples = {}
+
+    def add(self, stage: str, seconds: float):
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, stage: str, func):
+        """Return func wrapped so every call is timed as the given stage."""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def summary(self) -> dict:
+        """Return count, p50, p90, p99 and max in microseconds per stage."""
+        return {stage: percentiles(samples) for stage, samples in self.samples.items()}
+
+
+def percentiles(samples) -> dict:
+    """Return count, p50, p90, p99 and max of samples in seconds, as microseconds."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {'count': 0, 'p50': 0.0, 'p90': 0.0, 'p99': 0.0, 'max': 0.0}
+
+    def at(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e6
+
+    return {'count': len(ordered), 'p50': at(0.5), 'p90': at(0.9), 'p99': at(0.99), 'max': ordered[-1] * 1e6}
+
+
+def rss_bytes() -> int:
+    """Return the current resident set size of this process in bytes."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+
+
+def print_table(title: str, summary: dict):
+    """Print a per-stage percentile table."""
+    print(title)
+    print(f"  {'stage':<10} {'count':>8} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'max us':>10}")
+    for stage, stats in summary.items():
+        print(f"  {stage:<10} {stats['count']:>8} {stats['p50']:>10.1f} {stats['p90']:>10.1f} "
+              f"{stats['p99']:>10.1f} {stats['max']:>10.1f}")
@@ -0,0 +1,195 @@
+import io
+import os
+import hashlib
+import logging
+from dotenv import dotenv_values
+from expressions import compile_expression
+
+logger = logging.getLogger(__name__)
+
+# Name of the source configured by the API_* settings
+DEFAULT_SOURCE = 'default'
+
+def parse_headers(environ, prefix: str) -> dict:
+    """Collect HTTP headers from variables named <prefix><HEADER_NAME>."""
+    headers = {}
+    for key, value in environ.items():
+        if key.startswith(prefix) and len(key) > len(prefix):
+            name = '-'.join(part.capitalize() for part in key[len(prefix):].split('_'))
+            headers[name] = value
+    headers.setdefault('Accept', 'application/json')
+    return headers
+
+
+def optional_float(environ, key: str, default=None):
+    """Return a float setting, or the default if it is missing or empty."""
+    value = environ.get(key)
+    return float(value) if value else default
+
+
+def load_sources(environ) -> dict:
+    """Return the configured data sources keyed by name."""
+    defaults = {
+        'poll_interval': int(environ.get('POLL_INTERVAL', '30')),
+        'connect_timeout': float(environ.get('API_CONNECT_TIMEOUT', '5')),
+        'read_timeout': float(environ.get('API_READ_TIMEOUT', '10')),
+        'min_interval': optional_float(environ, 'POLL_INTERVAL_MIN'),
+        'max_interval': optional_float(environ, 'POLL_INTERVAL_MAX'),
+        'retry_max_delay': float(environ.get('RETRY_MAX_DELAY', '300')),
+        'poll_jitter': float(environ.get('POLL_JITTER', '0.1')),
+        'mode': environ.get('API_MODE', 'poll').lower(),
+        'stream_timeout': float(environ.get('API_STREAM_TIMEOUT', '60')),
+        'extract': environ.get('API_EXTRACT', 'full').lower(),
+        'shared_cache_dir': environ.get('SHARED_CACHE_DIR') or None,
+    }
+
+    sources = {}
+    if environ.get('API_URL'):
+        sources[DEFAULT_SOURCE] = dict(
+            defaults,
+            url=environ['API_URL'],
+            headers=parse_headers(environ, 'API_HEADERS_')
+        )
+
+    # Additional sources are defined with SOURCE_<NAME>_URL and optional per-source settings
+    for key in environ:
+        if not (key.startswith('SOURCE_') and key.endswith('_URL')) or len(key) <= len('SOURCE__URL'):
+            continue
+        name = key[len('SOURCE_'):-len('_URL')]
+        prefix = f'SOURCE_{name}_'
+        sources[name.lower()] = {
+            'url': environ[key],
+            'headers': parse_headers(environ, f'{prefix}HEADERS_'),
+            'poll_interval': int(environ.get(f'{prefix}POLL_INTERVAL', defaults['poll_interval'])),
+            'connect_timeout': float(environ.get(f'{prefix}CONNECT_TIMEOUT', defaults['connect_timeout'])),
+            'read_timeout': float(environ.get(f'{prefix}READ_TIMEOUT', defaults['read_timeout'])),
+            'min_interval': optional_float(environ, f'{prefix}POLL_INTERVAL_MIN', defaults['min_interval']),
+            'max_interval': optional_float(environ, f'{prefix}POLL_INTERVAL_MAX', defaults['max_interval']),
+            'retry_max_delay': defaults['retry_max_delay'],
+            'poll_jitter': defaults['poll_jitter'],
+            'mode': environ.get(f'{prefix}MODE', 'poll').lower(),
+            'stream_timeout': float(environ.get(f'{prefix}STREAM_TIMEOUT', defaults['stream_timeout'])),
+            'extract': environ.get(f'{prefix}EXTRACT', 'full').lower(),
+            'shared_cache_dir': defaults['shared_cache_dir'],
+        }
+    for name, source in sources.items():
+        if source['mode'] not in ('poll', 'stream'):
+            logger.error(f"Unknown mode '{source['mode']}' for source {name}, using poll")
+            source['mode'] = 'poll'
+        if source['extract'] not in ('full', 'stream'):
+            logger.error(f"Unknown extract mode '{source['extract']}' for source {name}, using full")
+            source['extract'] = 'full'
+    return sources
+
+
+def load_icons(environ, sources: dict) -> list:
+    """Return the configured icons as (label, path, source) tuples."""
+    icons = []
+    for key, value in environ.items():
+        if not key.startswith('ICON_'):
+            continue
+        label = key[5:]  # Remove 'ICON_' prefix
+        source = DEFAULT_SOURCE
+        path = value
+
+        # A "<source>:" prefix binds the icon to a named source
+        prefix, sep, rest = value.partition(':')
+        if sep and prefix.strip().lower() in sources:
+            source = prefix.strip().lower()
+            path = rest.strip()
+
+        if source not in sources:
+            logger.error(f"Icon {label} uses unknown source '{source}'")
+            continue
+        icons.append((label, path, source))
+    return icons
+
+
+def load_expressions(icons: list) -> dict:
+    """Compile the definition of each icon once, keyed by definition. Invalid definitions are left out."""
+    expressions = {}
+    for label, definition, _ in icons:
+        if definition in expressions:
+            continue
+        try:
+            expressions[definition] = compile_expression(definition)
+        except ValueError as e:
+            logger.error(f"Invalid definition for icon {label}: {e}")
+    return expressions
+
+
+def source_paths(config: dict, source: str) -> list:
+    """Return the JSON paths read by the icons bound to a source."""
+    return [path for _, definition, icon_source in config['icons'] if icon_source == source
+            for path in config['expressions'][definition].paths]
+
+
+def load_sparklines(environ, icons: list) -> dict:
+    """Return the time window in seconds of each icon drawn as a sparkline, keyed by label."""
+    labels = {label for label, _, _ in icons}
+    sparklines = {}
+    for key, value in environ.items():
+        if not key.startswith('SPARKLINE_'):
+            continue
+        label = key[len('SPARKLINE_'):]
+        if label not in labels:
+            logger.error(f"Sparkline setting {key} does not match any icon")
+            continue
+        try:
+            window = float(value)
+        except ValueError:
+            logger.error(f"Invalid sparkline window for {label}: {value}")
+            continue
+        if window > 0:
+            sparklines[label] = window
+    return sparklines
+
+
+def load_render(environ) -> dict:
+    """Return the renderer and font settings used to render the icons."""
+    return {
+        'renderer': environ.get('RENDERER', 'pillow').strip().lower(),
+        'font_path': environ.get('FONT_PATH', 'C:\\Windows\\Fonts\\bahnschrift.ttf'),
+        'label_font_size': int(environ.get('LABEL_FONT_SIZE', '13')),
+        'value_font_size': int(environ.get('VALUE_FONT_SIZE', '17')),
+    }
+
+
+def load_config(environ=None) -> dict:
+    """Build the application configuration from environment variables."""
+    if environ is None:
+        environ = os.environ
+    sources = load_sources(environ)
+    icons = load_icons(environ, sources)
+    expressions = load_expressions(icons)
+    icons = [icon for icon in icons if icon[1] in expressions]
+    return {
+        'sources': sources,
+        'icons': icons,
+        'expressions': expressions,  # Compiled icon definitions keyed by definition
+        'render': load_render(environ),
+        'icon_cache_size': int(environ.get('RENDER_CACHE_SIZE', '256')),
+        'history_size': max(1, int(environ.get('HISTORY_SIZE', '240'))),
+        'sparklines': load_sparklines(environ, icons),
+        'snapshot_file': environ.get('SNAPSHOT_FILE', 'snapshot.json') or None,
+        'metrics': {
+            'port': int(environ.get('METRICS_PORT') or 0),
+            'file': environ.get('METRICS_FILE') or None,
+            'file_interval': float(environ.get('METRICS_FILE_INTERVAL', '60')),
+        }
+    }
+
+
+def read_env_file(env_path: str, base_environ: dict):
+    """Read a .env file and return (environ, digest) for it.
+
+    Like load_dotenv(), variables from the process environment take precedence over the file.
+    The digest identifies the file content, so saves that change nothing can be ignored.
+    """
+    with open(env_path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+    values = dotenv_values(stream=io.StringIO(content.decode('utf-8')))
+    environ = {key: value for key, value in values.items() if value is not None}
+    environ.update(base_environ)
+    return environ, digest
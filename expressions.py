@@ -0,0 +1,249 @@
+import re
+import math
+import logging
+import operator
+
+logger = logging.getLogger(__name__)
+
+# Tokens of an expression: numbers, {json.path} references, function names and operators
+_TOKEN = re.compile(r'\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|\{(?P<path>[^{}]*)\}'
+                    r'|(?P<name>[A-Za-z_]\w*)|(?P<op>[-+*/(),]))')
+
+_OPERATORS = {'+': operator.add, '-': operator.sub, '*': operator.mul, '/': operator.truediv}
+
+
+def _avg(*numbers):
+    return sum(numbers) / len(numbers)
+
+
+# Function name -> (function, number of arguments or None for one or more). Functions are called with
+# the arguments as positional parameters, so min and max are wrapped: the builtins expect an iterable
+# when given a single argument
+FUNCTIONS = {
+    'min': (lambda *numbers: min(numbers), None),
+    'max': (lambda *numbers: max(numbers), None),
+    'sum': (lambda *numbers: sum(numbers), None),
+    'avg': (_avg, None),
+    'abs': (abs, 1),
+}
+
+# A format is an optional number spec (.1f, f, si, .2si) followed by a unit
+_FORMAT_SPEC = re.compile(r'(?:\.(?P<digits>\d+))?(?P<kind>f|si)$')
+
+_SI_PREFIXES = {-4: 'p', -3: 'n', -2: 'µ', -1: 'm', 0: '', 1: 'k', 2: 'M', 3: 'G', 4: 'T', 5: 'P'}
+
+
+def format_si(number: float, digits: int = 3) -> str:
+    """Format a number with an SI prefix and the given number of significant digits, e.g. 1234 -> 1.23k."""
+    if number == 0:
+        return '0'
+    digits = max(1, digits)
+    exponent = min(max(math.floor(math.log10(abs(number)) / 3), -4), 5)
+    scaled = number / 1000.0 ** exponent
+    text = f"{scaled:.{max(0, digits - 1 - math.floor(math.log10(abs(scaled))))}f}"
+    if abs(float(text)) >= 1000 and exponent < 5:
+        # Rounding carried over into the next prefix (999.7 -> 1000 -> 1.00k)
+        exponent += 1
+        text = f"{number / 1000.0 ** exponent:.{digits - 1}f}"
+    return text + _SI_PREFIXES[exponent]
+
+
+class ValueFormat:
+    """How an icon displays its number: as an integer (the default), with fixed decimals or with an SI prefix, plus a unit."""
+
+    __slots__ = ('kind', 'digits', 'unit')
+
+    def __init__(self, spec: str = ''):
+        self.kind = 'int'
+        self.digits = 0
+        self.unit = spec.strip()
+        words = spec.split(None, 1)
+        match = _FORMAT_SPEC.match(words[0]) if words else None
+        if match:
+            self.kind = match['kind']
+            if match['digits'] is not None:
+                self.digits = int(match['digits'])
+            elif self.kind == 'si':
+                self.digits = 3
+            self.unit = words[1].strip() if len(words) > 1 else ''
+
+    def format(self, number: float) -> str:
+        """Return the display text for a number."""
+        if not math.isfinite(number):
+            raise ValueError(f"Cannot display {number}")
+        if self.kind == 'f':
+            text = f"{number:.{self.digits}f}"
+        elif self.kind == 'si':
+            text = format_si(number, self.digits)
+        else:
+            text = str(int(number))
+        return text + self.unit
+
+
+class Expression:
+    """A compiled icon definition: the JSON paths it reads, how its number is computed and how it is displayed."""
+
+    __slots__ = ('text', 'paths', 'evaluate', 'value_format')
+
+    def __init__(self, text: str, paths: tuple, evaluate, value_format: ValueFormat):
+        self.text = text
+        self.paths = paths  # JSON paths the expression reads, each once
+        self.evaluate = evaluate  # Called with the extracted values by path, returns a float
+        self.value_format = value_format
+
+    def __repr__(self):
+        return f"Expression({self.text!r})"
+
+
+def _constant(number: float):
+    return lambda values: number
+
+
+def _load(path: str):
+    def load(values):
+        value = values[path]
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Value {value!r} at {path} is not a number")
+    return load
+
+
+def _negate(operand):
+    return lambda values: -operand(values)
+
+
+def _binary(symbol: str, left, right):
+    function = _OPERATORS[symbol]
+    return lambda values: function(left(values), right(values))
+
+
+def _call(function, arguments: list):
+    if len(arguments) == 1:
+        argument = arguments[0]
+        return lambda values: function(argument(values))
+    return lambda values: function(*[argument(values) for argument in arguments])
+
+
+class _Parser:
+    """Recursive descent parser turning an expression into nested closures."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = []  # (kind, value, position)
+        self.index = 0
+        self.paths = []
+        position = 0
+        while True:
+            match = _TOKEN.match(text, position)
+            if not match:
+                if text[position:].strip():
+                    offset = len(text[position:]) - len(text[position:].lstrip())
+                    raise ValueError(f"Unexpected '{text[position + offset]}' at position {position + offset}")
+                break
+            self.tokens.append((match.lastgroup, match[match.lastgroup], match.start(match.lastgroup)))
+            position = match.end()
+
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else (None, None, len(self.text))
+
+    def take(self, op: str = None):
+        kind, value, position = self.peek()
+        if op is not None and (kind, value) != ('op', op):
+            found = f"'{value}'" if kind else 'end of expression'
+            raise ValueError(f"Expected '{op}' at position {position}, found {found}")
+        self.index += 1
+        return kind, value, position
+
+    def parse(self):
+        node = self.sum()
+        kind, value, position = self.peek()
+        if kind is not None:
+            raise ValueError(f"Unexpected '{value}' at position {position}")
+        return node
+
+    def sum(self):
+        node = self.product()
+        while self.peek()[:2] in (('op', '+'), ('op', '-')):
+            _, symbol, _ = self.take()
+            node = _binary(symbol, node, self.product())
+        return node
+
+    def product(self):
+        node = self.unary()
+        while self.peek()[:2] in (('op', '*'), ('op', '/')):
+            _, symbol, _ = self.take()
+            node = _binary(symbol, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek()[:2] == ('op', '-'):
+            self.take()
+            return _negate(self.unary())
+        if self.peek()[:2] == ('op', '+'):
+            self.take()
+        return self.atom()
+
+    def atom(self):
+        kind, value, position = self.take()
+        if kind == 'number':
+            return _constant(float(value))
+        if kind == 'path':
+            path = value.strip()
+            if not path:
+                raise ValueError(f"Empty path at position {position}")
+            if path not in self.paths:
+                self.paths.append(path)
+            return _load(path)
+        if kind == 'name':
+            if value not in FUNCTIONS:
+                raise ValueError(f"Unknown function '{value}' at position {position}")
+            function, arity = FUNCTIONS[value]
+            self.take('(')
+            arguments = [self.sum()]
+            while self.peek()[:2] == ('op', ','):
+                self.take()
+                arguments.append(self.sum())
+            self.take(')')
+            if arity is not None and len(arguments) != arity:
+                raise ValueError(f"Function '{value}' takes {arity} argument(s), got {len(arguments)}")
+            return _call(function, arguments)
+        if (kind, value) == ('op', '('):
+            node = self.sum()
+            self.take(')')
+            return node
+        found = f"'{value}'" if kind else 'end of expression'
+        raise ValueError(f"Unexpected {found} at position {position}")
+
+
+def split_format(text: str) -> tuple:
+    """Split an icon definition into the expression and the format after the last '|' outside braces."""
+    depth = 0
+    split = -1
+    for index, char in enumerate(text):
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth = max(0, depth - 1)
+        elif char == '|' and not depth:
+            split = index
+    if split == -1:
+        return text, ''
+    return text[:split], text[split + 1:]
+
+
+def compile_expression(text: str) -> Expression:
+    """Compile an icon definition, raising ValueError if it is invalid.
+
+    The definition is a JSON path or an expression over {path} references, optionally followed by '| format'.
+    """
+    body, spec = split_format(text)
+    body = body.strip()
+    if not body:
+        raise ValueError("Missing path or expression")
+    if '{' not in body:
+        # A plain path, read as before
+        return Expression(text, (body,), _load(body), ValueFormat(spec))
+    parser = _Parser(body)
+    evaluate = parser.parse()
+    return Expression(text, tuple(parser.paths), evaluate, ValueFormat(spec))
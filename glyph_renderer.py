@@ -0,0 +1,169 @@
+import struct
+import logging
+import threading
+import numpy as np
+from PIL import Image, ImageDraw
+
+from icon_renderer import PillowRenderer, BITMAPINFOHEADER_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def rgba_array_to_dib(pixels: np.ndarray) -> bytes:
+    """Convert a top-down (height, width, 4) RGBA array into 32-bit icon DIB bytes."""
+    height, width = pixels.shape[:2]
+
+    # BGRA rows, stored bottom-up
+    xor_bits = np.ascontiguousarray(pixels[::-1, :, [2, 1, 0, 3]]).tobytes()
+
+    # AND mask: one bit per pixel, set where the pixel is fully transparent,
+    # rows padded to 32 bits and also stored bottom-up
+    mask_stride = ((width + 31) // 32) * 4
+    mask = np.zeros((height, mask_stride * 8), dtype=bool)
+    mask[:, :width] = pixels[::-1, :, 3] == 0
+    and_bits = np.packbits(mask, axis=1).tobytes()
+
+    header = struct.pack(
+        '<IiiHHIIiiII',
+        BITMAPINFOHEADER_SIZE,
+        width,
+        height * 2,  # Height covers both the XOR and the AND mask
+        1,  # Planes
+        32,  # Bits per pixel
+        0,  # BI_RGB
+        len(xor_bits) + len(and_bits),
+        0, 0, 0, 0
+    )
+    return header + xor_bits + and_bits
+
+
+def blend_over(canvas: np.ndarray, coverage: np.ndarray):
+    """Draw coverage values onto an alpha canvas in place, rounding like Pillow's text drawing."""
+    dst = canvas.astype(np.uint32)
+    src = coverage.astype(np.uint32)
+    blended = dst * (255 - src) + 255 * src + 128
+    canvas[:] = ((blended >> 8) + blended) >> 8
+
+
+class GlyphAtlas:
+    """Coverage bitmaps, offsets and advance widths of the characters of one font, rasterised on first use."""
+
+    def __init__(self, font):
+        self.font = font
+        self.glyphs = {}  # Character -> (coverage array or None, x offset, y offset, advance)
+        self.kerning = {}  # (left, right) -> advance adjustment
+        self.lock = threading.Lock()
+
+    def glyph(self, char: str) -> tuple:
+        """Return the coverage bitmap, offsets and advance of a character."""
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            with self.lock:
+                glyph = self.glyphs.get(char)
+                if glyph is None:
+                    glyph = self.glyphs[char] = self.rasterise(char)
+        return glyph
+
+    def rasterise(self, char: str) -> tuple:
+        """Draw a single character with Pillow and crop it to its bounding box."""
+        # The origin is placed far enough inside the canvas for any bearing of the glyph
+        size = max(int(getattr(self.font, 'size', 16)), 8)
+        origin = size * 2
+        image = Image.new('L', (origin * 3, origin * 3), 0)
+        ImageDraw.Draw(image).text((origin, origin), char, fill=255, font=self.font)
+        advance = self.font.getlength(char)
+        bbox = image.getbbox()
+        if bbox is None:
+            return None, 0, 0, advance
+        left, top, right, bottom = bbox
+        coverage = np.asarray(image.crop(bbox), dtype=np.uint8)
+        return coverage, left - origin, top - origin, advance
+
+    def kern(self, left: str, right: str) -> float:
+        """Return the kerning adjustment between two characters."""
+        pair = (left, right)
+        adjustment = self.kerning.get(pair)
+        if adjustment is None:
+            adjustment = self.font.getlength(left + right) - self.glyph(left)[3] - self.glyph(right)[3]
+            self.kerning[pair] = adjustment
+        return adjustment
+
+    def layout(self, text: str) -> tuple:
+        """Return the width of a text and the pen position of each of its characters."""
+        pen = 0.0
+        positions = []
+        previous = None
+        for char in text:
+            if previous is not None:
+                pen += self.kern(previous, char)
+            positions.append(pen)
+            pen += self.glyph(char)[3]
+            previous = char
+        return pen, positions
+
+    def draw(self, canvas: np.ndarray, text: str, x: int, y: int, positions=None):
+        """Composite a text onto an alpha canvas with its origin at (x, y), clipped to the canvas."""
+        if positions is None:
+            _, positions = self.layout(text)
+        height, width = canvas.shape
+        for char, pen in zip(text, positions):
+            coverage, offset_x, offset_y, _ = self.glyph(char)
+            if coverage is None:
+                continue
+            left = x + int(round(pen)) + offset_x
+            top = y + offset_y
+            rows, columns = coverage.shape
+            # Clip the glyph to the canvas
+            x0, y0 = max(left, 0), max(top, 0)
+            x1, y1 = min(left + columns, width), min(top + rows, height)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            blend_over(canvas[y0:y1, x0:x1], coverage[y0 - top:y1 - top, x0 - left:x1 - left])
+
+
+class GlyphRenderer(PillowRenderer):
+    """Composites pre-rasterised characters with NumPy instead of drawing text through FreeType on every update.
+
+    Produces the same layout as PillowRenderer. The label line is composited once per label and reused.
+    """
+
+    def __init__(self, font_path: str, label_font_size: int, value_font_size: int, label_cache_size: int = 256):
+        super().__init__(font_path, label_font_size, value_font_size)
+        label_font, value_font = self.load_fonts()
+        self.label_atlas = GlyphAtlas(label_font)
+        self.value_atlas = GlyphAtlas(value_font)
+        self.label_cache_size = label_cache_size
+        self.labels = {}  # Label -> alpha array with only the label drawn
+
+    def label_layer(self, label: str) -> np.ndarray:
+        """Return the alpha channel of an icon with only the label drawn, composited on first use."""
+        layer = self.labels.get(label)
+        if layer is None:
+            layer = np.zeros((self.size, self.size), dtype=np.uint8)
+            width, positions = self.label_atlas.layout(label)
+            self.label_atlas.draw(layer, label, int((self.size - width) // 2), 1, positions)
+            layer.setflags(write=False)
+            if len(self.labels) >= self.label_cache_size:
+                self.labels.clear()
+            self.labels[label] = layer
+        return layer
+
+    def draw_array(self, label: str, value: str) -> np.ndarray:
+        """Draw the label and value and return the icon as a (size, size, 4) RGBA array."""
+        alpha = self.label_layer(label).copy()
+        width, positions = self.value_atlas.layout(value)
+        self.value_atlas.draw(alpha, value, int((self.size - width) // 2), 12, positions)
+
+        # The text is black, so only the alpha channel carries the drawing
+        pixels = np.zeros((self.size, self.size, 4), dtype=np.uint8)
+        pixels[:, :, 3] = alpha
+        return pixels
+
+    def draw_image(self, label: str, value: str) -> Image.Image:
+        return Image.fromarray(self.draw_array(label, value), 'RGBA')
+
+    def draw(self, label: str, value: str) -> bytes:
+        return self.draw_array(label, value).tobytes()
+
+    def render(self, label: str, value: str) -> bytes:
+        return rgba_array_to_dib(self.draw_array(label, value))
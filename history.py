@@ -0,0 +1,62 @@
+import threading
+from array import array
+
+
+class History:
+    """Fixed-size ring buffer of (timestamp, value) samples stored in two arrays of doubles.
+
+    Memory use is 16 bytes per sample of capacity, however many samples are appended.
+    """
+
+    __slots__ = ('capacity', 'timestamps', 'values', 'count', 'position', 'lock')
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"History capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self.timestamps = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.count = 0  # Number of valid samples
+        self.position = 0  # Index the next sample is written to
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, timestamp: float, value: float):
+        """Add a sample, overwriting the oldest one once the buffer is full."""
+        with self.lock:
+            self.timestamps[self.position] = timestamp
+            self.values[self.position] = value
+            self.position = (self.position + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def samples(self) -> tuple:
+        """Return copies of the timestamps and values, oldest first."""
+        with self.lock:
+            if self.count < self.capacity:
+                return self.timestamps[:self.count], self.values[:self.count]
+            start = self.position
+            return (self.timestamps[start:] + self.timestamps[:start],
+                    self.values[start:] + self.values[:start])
+
+    def latest(self):
+        """Return the newest (timestamp, value) sample, or None if there is none."""
+        with self.lock:
+            if not self.count:
+                return None
+            index = (self.position - 1) % self.capacity
+            return self.timestamps[index], self.values[index]
+
+    def clear(self):
+        """Remove all samples."""
+        with self.lock:
+            self.count = 0
+            self.position = 0
+
+    def resized(self, capacity: int) -> 'History':
+        """Return a new history of another capacity holding the newest samples of this one."""
+        history = History(capacity)
+        for timestamp, value in zip(*(samples[-capacity:] for samples in self.samples())):
+            history.append(timestamp, value)
+        return history
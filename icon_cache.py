@@ -0,0 +1,105 @@
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class IconCache:
+    """Bounded LRU cache of rendered icon handles keyed by (label, value, style).
+
+    Handles are reference counted: the cache entry holds one reference and every caller of get() or
+    put() receives another, which it must give back with drop(). A handle is released once the last
+    reference is gone, so an evicted handle stays valid while an icon still shows it.
+    """
+
+    def __init__(self, max_size: int = 256, release=None):
+        self.max_size = max_size
+        self.release = release  # Called with each handle once nothing references it
+        self.entries = OrderedDict()
+        self.refs = {}  # Handle -> number of references
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Return a new reference to the cached handle for a key and mark it as recently used, or None."""
+        with self.lock:
+            handle = self.entries.get(key)
+            if handle is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.refs[handle] += 1
+            self.hits += 1
+            return handle
+
+    def put(self, key, handle):
+        """Store a new handle, keeping a reference for the caller and evicting the least recently used ones."""
+        unreferenced = []
+        with self.lock:
+            self.refs[handle] = self.refs.get(handle, 0) + 2  # The cache entry and the caller
+            old = self.entries.pop(key, None)
+            if old is not None and self._unref(old):
+                unreferenced.append(old)
+            self.entries[key] = handle
+            while len(self.entries) > self.max_size:
+                _, lru_handle = self.entries.popitem(last=False)
+                self.evictions += 1
+                if self._unref(lru_handle):
+                    unreferenced.append(lru_handle)
+        for old_handle in unreferenced:
+            self._release(old_handle)
+
+    def drop(self, handle):
+        """Give back a reference obtained from get() or put()."""
+        with self.lock:
+            if handle not in self.refs:
+                logger.error(f"Icon handle {handle} dropped more often than referenced")
+                return
+            unreferenced = self._unref(handle)
+        if unreferenced:
+            self._release(handle)
+
+    def holds(self, handle) -> bool:
+        """Return whether a handle was handed out by this cache and is still referenced."""
+        with self.lock:
+            return handle in self.refs
+
+    def clear(self):
+        """Remove all entries, releasing the handles that are not referenced elsewhere."""
+        with self.lock:
+            handles = [handle for handle in self.entries.values() if self._unref(handle)]
+            self.entries.clear()
+        for handle in handles:
+            self._release(handle)
+
+    def _unref(self, handle) -> bool:
+        """Remove one reference to a handle and return whether it was the last one (lock held)."""
+        self.refs[handle] -= 1
+        if self.refs[handle]:
+            return False
+        del self.refs[handle]
+        return True
+
+    def _release(self, handle):
+        """Release a handle that is no longer referenced."""
+        if self.release is None:
+            return
+        try:
+            self.release(handle)
+        except Exception as e:
+            logger.error(f"Error releasing cached icon {handle}: {e}")
+
+    def stats(self) -> dict:
+        """Return the number of cached and live icons and the hit/miss/eviction counts."""
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'live': len(self.refs),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
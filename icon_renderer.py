@@ -0,0 +1,183 @@
+import struct
+import logging
+import threading
+from PIL import Image, ImageDraw, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Size of the tray icons in pixels
+ICON_SIZE = 32
+
+# Size of a BITMAPINFOHEADER in bytes
+BITMAPINFOHEADER_SIZE = 40
+
+
+def rgba_to_dib(rgba: bytes, width: int = ICON_SIZE, height: int = ICON_SIZE) -> bytes:
+    """Convert a top-down RGBA buffer into 32-bit icon DIB bytes (header, XOR and AND mask)."""
+    if len(rgba) != width * height * 4:
+        raise ValueError(f"Expected {width * height * 4} bytes of RGBA data, got {len(rgba)}")
+
+    # Swap red and blue channels (DIBs store pixels as BGRA)
+    bgra = bytearray(rgba)
+    bgra[0::4] = rgba[2::4]
+    bgra[2::4] = rgba[0::4]
+
+    # DIB rows are stored bottom-up
+    stride = width * 4
+    xor_bits = b''.join(bgra[row * stride:(row + 1) * stride] for row in range(height - 1, -1, -1))
+
+    # AND mask: one bit per pixel, set where the pixel is fully transparent,
+    # rows padded to 32 bits and also stored bottom-up
+    mask_stride = ((width + 31) // 32) * 4
+    and_bits = bytearray()
+    for row in range(height - 1, -1, -1):
+        mask_row = bytearray(mask_stride)
+        alpha = rgba[row * stride + 3:(row + 1) * stride:4]
+        for x, a in enumerate(alpha):
+            if a == 0:
+                mask_row[x >> 3] |= 0x80 >> (x & 7)
+        and_bits += mask_row
+
+    header = struct.pack(
+        '<IiiHHIIiiII',
+        BITMAPINFOHEADER_SIZE,
+        width,
+        height * 2,  # Height covers both the XOR and the AND mask
+        1,  # Planes
+        32,  # Bits per pixel
+        0,  # BI_RGB
+        len(xor_bits) + len(and_bits),
+        0, 0, 0, 0
+    )
+    return header + xor_bits + bytes(and_bits)
+
+
+def dib_to_ico(dib: bytes, width: int = ICON_SIZE, height: int = ICON_SIZE) -> bytes:
+    """Wrap icon DIB bytes in an ICO file container."""
+    icon_dir = struct.pack('<HHH', 0, 1, 1)  # Reserved, type (1 = icon), image count
+    entry = struct.pack(
+        '<BBBBHHII',
+        width % 256,  # 0 means 256
+        height % 256,
+        0,  # No palette
+        0,  # Reserved
+        1,  # Planes
+        32,  # Bits per pixel
+        len(dib),
+        6 + 16  # Offset of the image data (ICONDIR + one ICONDIRENTRY)
+    )
+    return icon_dir + entry + dib
+
+
+class FontCache:
+    """Process-wide cache of loaded fonts keyed by (path, size), including failed loads."""
+
+    def __init__(self):
+        self.fonts = {}
+        self.config = None
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def configure(self, config) -> bool:
+        """Set the current font configuration, clearing the cache if it changed."""
+        with self.lock:
+            if config == self.config:
+                return False
+            self.config = config
+            self.fonts.clear()
+            logger.info(f"Font configuration changed to {config}, font cache cleared")
+            return True
+
+    def get(self, font_path: str, size: int):
+        """Return the font for a path and size, loading it on first use."""
+        key = (font_path, size)
+        with self.lock:
+            font = self.fonts.get(key)
+            if font is not None:
+                self.hits += 1
+                return font
+            self.misses += 1
+            try:
+                font = ImageFont.truetype(font_path, size)
+                logger.info(f"Loaded font {font_path} at size {size}")
+            except Exception as e:
+                # Remember the failure so the file is not parsed (and logged) again
+                logger.warning(f"Failed to load font {font_path}: {e}")
+                logger.warning("Using default font")
+                font = ImageFont.load_default()
+            self.fonts[key] = font
+            return font
+
+    def stats(self) -> dict:
+        """Return the number of cached fonts and the hit/miss counts."""
+        with self.lock:
+            return {'fonts': len(self.fonts), 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared font cache for all renderers
+font_cache = FontCache()
+
+
+class IconRenderer:
+    """Base class for turning a label and a value into icon image bytes."""
+
+    size = ICON_SIZE
+
+    def style_key(self) -> tuple:
+        """Return a hashable key describing everything besides label and value that affects the output."""
+        return (type(self).__name__, self.size)
+
+    def draw(self, label: str, value: str) -> bytes:
+        """Draw the icon and return its pixels as top-down RGBA bytes."""
+        raise NotImplementedError
+
+    def render(self, label: str, value: str) -> bytes:
+        """Render the icon and return 32-bit icon DIB bytes."""
+        return rgba_to_dib(self.draw(label, value), self.size, self.size)
+
+    def render_ico(self, label: str, value: str) -> bytes:
+        """Render the icon and return the contents of an ICO file."""
+        return dib_to_ico(self.render(label, value), self.size, self.size)
+
+
+class PillowRenderer(IconRenderer):
+    """Renders the label and value with Pillow's FreeType text drawing."""
+
+    def __init__(self, font_path: str, label_font_size: int, value_font_size: int):
+        self.font_path = font_path
+        self.label_font_size = label_font_size
+        self.value_font_size = value_font_size
+        font_cache.configure((font_path, label_font_size, value_font_size))
+
+    def style_key(self) -> tuple:
+        return super().style_key() + (self.font_path, self.label_font_size, self.value_font_size)
+
+    def load_fonts(self):
+        """Return the label and value fonts from the shared font cache."""
+        label_font = font_cache.get(self.font_path, self.label_font_size)
+        value_font = font_cache.get(self.font_path, self.value_font_size)
+        return label_font, value_font
+
+    def draw_image(self, label: str, value: str) -> Image.Image:
+        """Draw the label and value onto a transparent RGBA image."""
+        image = Image.new('RGBA', (self.size, self.size), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(image)
+
+        label_font, value_font = self.load_fonts()
+
+        # Draw the text - measure each line separately
+        label_width = draw.textlength(label, font=label_font)
+        value_width = draw.textlength(value, font=value_font)
+
+        # Calculate positions
+        label_position = ((self.size - label_width) // 2, 1)
+        value_position = ((self.size - value_width) // 2, 12)
+
+        # Draw each line separately with different fonts
+        draw.text(label_position, label, fill='black', font=label_font)
+        draw.text(value_position, value, fill='black', font=value_font)
+        return image
+
+    def draw(self, label: str, value: str) -> bytes:
+        return self.draw_image(label, value).tobytes('raw', 'RGBA')
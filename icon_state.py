@@ -0,0 +1,69 @@
+from ctypes import Structure, c_uint, sizeof, wintypes
+
+
+class NOTIFYICONDATA(Structure):
+    _fields_ = [
+        ('cbSize', c_uint),
+        ('hWnd', wintypes.HWND),
+        ('uID', c_uint),
+        ('uFlags', c_uint),
+        ('uCallbackMessage', c_uint),
+        ('hIcon', wintypes.HICON),
+        ('szTip', wintypes.WCHAR * 128)
+    ]
+
+
+class IconState:
+    """State of one tray icon: its binding, what it shows, its NOTIFYICONDATA and the icon handle it holds.
+
+    The icon holds one reference to its handle, obtained from the icon cache, and gives it back through
+    `release` exactly once: when the handle is replaced or the icon is closed.
+    """
+
+    __slots__ = ('label', 'path', 'source', 'expression', 'nid', 'handle', 'release', 'created', 'value', 'image', 'tooltip',
+                 'stale', 'history', 'sparkline')
+
+    def __init__(self, label: str, path: str, source: str, expression, hwnd, uid: int, callback_message: int, release,
+                 history, sparkline: float = None):
+        self.label = label
+        self.path = path
+        self.source = source
+        self.expression = expression  # Compiled path, used to compute and format the value
+
+        # One NOTIFYICONDATA per icon, filled in for every shell call
+        self.nid = NOTIFYICONDATA()
+        self.nid.cbSize = sizeof(NOTIFYICONDATA)
+        self.nid.hWnd = hwnd
+        self.nid.uID = uid
+        self.nid.uCallbackMessage = callback_message
+
+        self.handle = None  # Icon handle currently shown
+        self.release = release  # Called with each handle the icon no longer holds
+        self.created = False  # True once the shell has added the icon
+        self.value = None  # Latest formatted value
+        self.image = None  # Value or sparkline chart currently drawn in the icon
+        self.tooltip = ''  # Tooltip currently shown
+        self.stale = False  # True while showing the value saved by a previous run
+        self.history = history  # Recent (timestamp, value) samples
+        self.sparkline = sparkline  # Time window of the sparkline in seconds, None to show the value
+
+    @property
+    def uid(self) -> int:
+        return self.nid.uID
+
+    def notify_data(self, flags: int, handle=None, tooltip: str = None) -> NOTIFYICONDATA:
+        """Return the icon's NOTIFYICONDATA set up for a shell call with the given flags, icon and tooltip."""
+        self.nid.uFlags = flags
+        self.nid.hIcon = handle if handle is not None else self.handle
+        self.nid.szTip = tooltip if tooltip is not None else self.tooltip
+        return self.nid
+
+    def set_handle(self, handle):
+        """Take over a handle reference and give back the one held before."""
+        previous, self.handle = self.handle, handle
+        if previous is not None:
+            self.release(previous)
+
+    def close(self):
+        """Give back the handle reference; safe to call more than once."""
+        self.set_handle(None)
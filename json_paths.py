@@ -0,0 +1,387 @@
+import re
+import json
+import codecs
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_path(path: str) -> tuple:
+    """Parse a dotted JSON path into a tuple of dict keys (str) and list indices (int).
+
+    Supports `a.b.c`, list indices as `a[0].b` and escaped dots as `a\\.b`.
+    """
+    segments = []
+    current = []
+    pending = False  # True if the current segment was started (may be empty after an index)
+    i = 0
+    while i < len(path):
+        char = path[i]
+        if char == '\\':
+            if i + 1 >= len(path):
+                raise ValueError(f"Dangling escape at end of path '{path}'")
+            current.append(path[i + 1])
+            pending = True
+            i += 2
+            continue
+        if char == '.':
+            if not current and not pending:
+                raise ValueError(f"Empty segment in path '{path}'")
+            if current:
+                segments.append(''.join(current))
+            current = []
+            pending = False
+        elif char == '[':
+            end = path.find(']', i)
+            if end == -1:
+                raise ValueError(f"Unclosed '[' in path '{path}'")
+            index = path[i + 1:end].strip()
+            try:
+                index = int(index)
+            except ValueError:
+                raise ValueError(f"Invalid list index '{index}' in path '{path}'")
+            if current:
+                segments.append(''.join(current))
+                current = []
+            segments.append(index)
+            pending = True  # An index may be followed by '.' or '['
+            i = end + 1
+            continue
+        else:
+            current.append(char)
+            pending = True
+        i += 1
+    if current:
+        segments.append(''.join(current))
+    elif not pending:
+        raise ValueError(f"Empty segment in path '{path}'")
+    return tuple(segments)
+
+
+# Byte patterns used to scan a streamed document
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*')  # Stops at the closing quote or at a backslash without its escaped byte
+_SCALAR = re.compile(rb'[^ \t\n\r,\]}]*')
+
+
+def _container_pattern(depth: int) -> bytes:
+    """Return a pattern matching a complete object or list nested at most `depth` levels deep."""
+    text = rb'[^\[\]{}"]*'
+    item = _STRING if depth == 1 else rb'(?:' + _STRING + rb'|' + _container_pattern(depth - 1) + rb')'
+    return rb'[\[{]' + text + rb'(?:' + item + text + rb')*[\]}]'
+
+
+# Everything a skipped container holds up to the next bracket that changes its depth: text, complete
+# strings and complete containers up to 8 levels deep, so that whole records are skipped in one match
+# and only deeper nesting and containers cut by a chunk boundary are walked bracket by bracket
+_SKIP = re.compile(rb'[^\[\]{}"]*(?:(?:' + _STRING + rb'|' + _container_pattern(8) + rb')[^\[\]{}"]*)*')
+
+_QUOTE, _COLON, _COMMA = ord('"'), ord(':'), ord(',')
+_OPEN = {ord('{'), ord('[')}
+
+
+def resolve_segment(value, segment):
+    """Resolve one path segment against a dict or list."""
+    if isinstance(value, list):
+        if isinstance(segment, str):
+            if not segment.lstrip('-').isdigit():
+                raise KeyError(f"Cannot look up key '{segment}' in a list")
+            segment = int(segment)
+        if not -len(value) <= segment < len(value):
+            raise KeyError(f"Index [{segment}] out of range")
+        return value[segment]
+    if isinstance(value, dict):
+        if isinstance(segment, int):
+            raise KeyError(f"Cannot use index [{segment}] on an object")
+        if segment not in value:
+            raise KeyError(f"Key '{segment}' not found")
+        return value[segment]
+    raise KeyError(f"Cannot look up '{segment}' in a {type(value).__name__}")
+
+
+class _StreamReader:
+    """Buffered reader over the byte chunks of a JSON document that keeps only the unparsed part in memory."""
+
+    __slots__ = ('chunks', 'buffer', 'pos', 'mark', 'offset', 'digest')
+
+    def __init__(self, chunks, digest=None):
+        self.chunks = iter(chunks)
+        self.buffer = bytearray()
+        self.pos = 0  # Parse position in the buffer
+        self.mark = None  # Start of a value being captured, kept in the buffer until it is complete
+        self.offset = 0  # Bytes dropped from the front of the buffer
+        self.digest = digest  # Updated with every byte the parser consumed
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer, dropping the parsed bytes before it. Returns False at the end."""
+        for chunk in self.chunks:
+            if chunk:
+                break
+        else:
+            return False
+        if not self.offset and not self.buffer and chunk.startswith(codecs.BOM_UTF8):
+            chunk = chunk[len(codecs.BOM_UTF8):]  # Accepted like json.loads() does
+        keep = self.pos if self.mark is None else self.mark
+        if self.digest is not None:
+            self.digest.update(memoryview(self.buffer)[:keep])
+        del self.buffer[:keep]
+        self.buffer += chunk
+        self.offset += keep
+        self.pos -= keep
+        if self.mark is not None:
+            self.mark -= keep
+        return True
+
+    def finish(self):
+        """Add the bytes consumed from the last chunk to the digest."""
+        if self.digest is not None:
+            self.digest.update(memoryview(self.buffer)[:self.pos])
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"{message} at byte {self.offset + self.pos}")
+
+    def peek(self) -> int:
+        """Skip whitespace and return the next byte without consuming it."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                raise self.error("Unexpected end of JSON document")
+
+    def expect(self, char: int):
+        """Consume the next non-whitespace byte, which must be the given one."""
+        if self.peek() != char:
+            raise self.error(f"Expected '{chr(char)}'")
+        self.pos += 1
+
+    def capture(self):
+        """Decode the next value."""
+        self.peek()
+        self.mark = self.pos
+        try:
+            self.skip()
+            return json.loads(self.buffer[self.mark:self.pos])
+        except json.JSONDecodeError as e:
+            raise self.error(f"Invalid JSON value ({e.msg})")
+        finally:
+            self.mark = None
+
+    def skip(self):
+        """Consume the next value without decoding it."""
+        char = self.peek()
+        if char == _QUOTE:
+            self.skip_string()
+        elif char in _OPEN:
+            self.pos += 1
+            depth = 1
+            while True:
+                end = _SKIP.match(self.buffer, self.pos).end()
+                self.pos = end
+                if end == len(self.buffer):
+                    if not self.fill():
+                        raise self.error("Unexpected end of JSON document")
+                    continue
+                char = self.buffer[end]
+                if char == _QUOTE:
+                    self.skip_string()  # A string that continues in the next chunk
+                    continue
+                self.pos += 1
+                depth += 1 if char in _OPEN else -1
+                if not depth:
+                    return
+        else:
+            while True:
+                end = _SCALAR.match(self.buffer, self.pos).end()
+                if end < len(self.buffer) or not self.fill():
+                    break
+            if end == self.pos:
+                raise self.error(f"Unexpected character '{chr(char)}'")
+            self.pos = end
+
+    def skip_string(self):
+        """Consume the string starting at the parse position, reading as many chunks as it spans."""
+        self.pos += 1
+        while True:
+            end = _STRING_BODY.match(self.buffer, self.pos).end()
+            if end < len(self.buffer) and self.buffer[end] == _QUOTE:
+                self.pos = end + 1
+                return
+            self.pos = end  # Continue after the last complete character
+            if not self.fill():
+                raise self.error("Unterminated string")
+
+
+class _Node:
+    """A node of the path trie."""
+
+    __slots__ = ('children', 'paths')
+
+    def __init__(self):
+        self.children = {}
+        self.paths = []  # Paths that end at this node
+
+
+class PathExtractor:
+    """Extracts many JSON paths at once, resolving shared prefixes only once per document."""
+
+    def __init__(self, paths):
+        self.root = _Node()
+        self.paths = []
+        self.invalid = {}  # Path -> error message for paths that failed to compile
+        for path in paths:
+            self.add(path)
+
+    def add(self, path: str):
+        """Compile a path and add it to the trie."""
+        if path in self.paths or path in self.invalid:
+            return
+        try:
+            segments = parse_path(path)
+        except ValueError as e:
+            logger.error(f"Invalid JSON path '{path}': {e}")
+            self.invalid[path] = str(e)
+            return
+        node = self.root
+        for segment in segments:
+            node = node.children.setdefault(segment, _Node())
+        node.paths.append(path)
+        self.paths.append(path)
+
+    def extract(self, data):
+        """Return (values, errors) dicts keyed by path for a decoded JSON document."""
+        values = {}
+        errors = dict(self.invalid)
+        self._walk(self.root, data, values, errors)
+        return values, errors
+
+    def extract_stream(self, chunks, digest=None):
+        """Return (values, errors) dicts keyed by path for a JSON document read from an iterable of byte chunks.
+
+        Only the values at the configured paths are decoded, everything else is skipped without building
+        objects, and reading stops as soon as every path is resolved. If given, `digest` (a hashlib object)
+        is updated with the bytes that were read up to that point.
+        """
+        values = {}
+        errors = dict(self.invalid)
+        reader = _StreamReader(chunks, digest)
+        if not self._complete(values, errors):
+            self._walk_stream(self.root, reader, values, errors)
+        reader.finish()
+        return values, errors
+
+    def _complete(self, values, errors) -> bool:
+        """Return whether every path has a value or an error."""
+        return len(values) + len(errors) == len(self.paths) + len(self.invalid)
+
+    def _walk_stream(self, node, reader, values, errors):
+        if not node.paths:
+            char = reader.peek()
+            if char == ord('{'):
+                self._walk_object(node, reader, values, errors)
+                return
+            if char == ord('['):
+                indices = self._list_indices(node, errors)
+                if indices is not None:
+                    self._walk_list(node, indices, reader, values, errors)
+                    return
+        # Decode the value if it is extracted itself (or cannot hold the children) and resolve the children from it
+        self._walk(node, reader.capture(), values, errors)
+
+    def _walk_object(self, node, reader, values, errors):
+        pending = {}  # Key -> child node not seen yet
+        for segment, child in node.children.items():
+            if isinstance(segment, int):
+                self._fail(child, f"Cannot use index [{segment}] on an object", errors)
+            else:
+                pending[segment] = child
+        reader.expect(ord('{'))
+        if reader.peek() == ord('}'):
+            reader.pos += 1
+        else:
+            while True:
+                if reader.peek() != _QUOTE:
+                    raise reader.error("Expected object key")
+                key = reader.capture()
+                reader.expect(_COLON)
+                child = pending.pop(key, None)  # Later duplicates of a key are skipped
+                if child is None:
+                    reader.skip()
+                else:
+                    self._walk_stream(child, reader, values, errors)
+                    if self._complete(values, errors):
+                        return  # Leave the rest of the document unread
+                char = reader.peek()
+                reader.pos += 1
+                if char == ord('}'):
+                    break
+                if char != _COMMA:
+                    raise reader.error("Expected ',' or '}'")
+        for key, child in pending.items():
+            self._fail(child, f"Key '{key}' not found", errors)
+
+    def _list_indices(self, node, errors):
+        """Return {index: [child nodes]} for walking a list, or None if a negative index needs the whole list."""
+        indices = {}
+        for segment, child in node.children.items():
+            if isinstance(segment, str):
+                if not segment.lstrip('-').isdigit():
+                    continue  # Fails when the list is resolved
+                segment = int(segment)
+            if segment < 0:
+                return None
+            indices.setdefault(segment, []).append(child)
+        for segment, child in node.children.items():
+            if isinstance(segment, str) and not segment.lstrip('-').isdigit():
+                self._fail(child, f"Cannot look up key '{segment}' in a list", errors)
+        return indices
+
+    def _walk_list(self, node, indices, reader, values, errors):
+        reader.expect(ord('['))
+        if reader.peek() == ord(']'):
+            reader.pos += 1
+        else:
+            index = 0
+            while True:
+                children = indices.pop(index, None)
+                if children is None:
+                    reader.skip()
+                else:
+                    if len(children) == 1:
+                        self._walk_stream(children[0], reader, values, errors)
+                    else:
+                        # Paths like a[0] and a.0 share the element
+                        value = reader.capture()
+                        for child in children:
+                            self._walk(child, value, values, errors)
+                    if self._complete(values, errors):
+                        return
+                char = reader.peek()
+                reader.pos += 1
+                if char == ord(']'):
+                    break
+                if char != _COMMA:
+                    raise reader.error("Expected ',' or ']'")
+                index += 1
+        for index, children in indices.items():
+            for child in children:
+                self._fail(child, f"Index [{index}] out of range", errors)
+
+    def _walk(self, node, value, values, errors):
+        for path in node.paths:
+            values[path] = value
+        for segment, child in node.children.items():
+            try:
+                child_value = resolve_segment(value, segment)
+            except KeyError as e:
+                self._fail(child, e.args[0], errors)
+                continue
+            self._walk(child, child_value, values, errors)
+
+    def _fail(self, node, message, errors):
+        """Record an error for every path below a node."""
+        for path in node.paths:
+            errors[path] = message
+        for child in node.children.values():
+            self._fail(child, message, errors)
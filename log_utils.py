@@ -0,0 +1,52 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+
+class RateLimitFilter(logging.Filter):
+    """Lets the first of identical warnings/errors through and suppresses repeats within an interval.
+
+    The next identical message after the interval carries a summary such as
+    "(×120 in last 60 min)", so a persistent failure logs about once per interval.
+    """
+
+    def __init__(self, interval: float = 3600.0, level: int = logging.WARNING, max_keys: int = 1000,
+                 clock=time.monotonic):
+        super().__init__()
+        self.interval = interval
+        self.level = level
+        self.max_keys = max_keys
+        self.clock = clock
+        self.seen = OrderedDict()  # (level, message) -> [window start, suppressed count]
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < self.level:
+            return True
+        key = (record.levelno, record.getMessage())
+        now = self.clock()
+        with self.lock:
+            state = self.seen.get(key)
+            if state is not None and now - state[0] < self.interval:
+                state[1] += 1
+                return False
+            if state is not None and state[1]:
+                # Report how often the message was suppressed in the window that just ended
+                record.msg = f"{record.getMessage()} (×{state[1] + 1} in last {self.describe_interval()})"
+                record.args = None
+            self.seen[key] = [now, 0]
+            self.seen.move_to_end(key)
+            while len(self.seen) > self.max_keys:
+                self.seen.popitem(last=False)
+        return True
+
+    def describe_interval(self) -> str:
+        minutes = self.interval / 60
+        return f"{minutes:g} min" if minutes < 120 else f"{minutes / 60:g} h"
+
+    def summaries(self) -> list:
+        """Return messages for all repeats that were suppressed but not yet reported."""
+        with self.lock:
+            return [(level, f"{message} (×{count} more in last {self.describe_interval()})")
+                    for (level, message), (_, count) in self.seen.items() if count]
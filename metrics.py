@@ -0,0 +1,167 @@
+import os
+import time
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency histogram buckets in seconds
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5,
+                   5.0, 10.0)
+
+
+def escape_label(value) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(labels) -> str:
+    """Format a tuple of (name, value) pairs as Prometheus labels."""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in labels) + '}'
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Process-wide stage histograms and counters, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.histograms = {}  # Label tuple -> Histogram
+        self.counters = {}  # (name, label tuple) -> value
+        self.collectors = []  # Callables returning (name, labels, value) gauges
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, **labels):
+        """Record the duration of a pipeline stage."""
+        key = (('stage', stage),) + tuple(sorted(labels.items()))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str, **labels):
+        """Time the enclosed block as a pipeline stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+
+    def increment(self, name: str, amount: int = 1, **labels):
+        """Increase a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def add_collector(self, collector):
+        """Register a callable returning (name, labels dict, value) gauges, read at render time."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Return all metrics in Prometheus text exposition format."""
+        lines = [
+            '# HELP systray_stage_duration_seconds Duration of each update pipeline stage.',
+            '# TYPE systray_stage_duration_seconds histogram',
+        ]
+        with self.lock:
+            histograms = [(key, list(h.counts), h.sum, h.count, h.buckets) for key, h in self.histograms.items()]
+            counters = sorted(self.counters.items())
+        for key, counts, total, count, buckets in sorted(histograms):
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f'systray_stage_duration_seconds_bucket{format_labels(key + (("le", bound),))} '
+                             f'{cumulative}')
+            lines.append(f'systray_stage_duration_seconds_sum{format_labels(key)} {total}')
+            lines.append(f'systray_stage_duration_seconds_count{format_labels(key)} {count}')
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name}{format_labels(labels)} {value}')
+
+        for collector in self.collectors:
+            try:
+                gauges = sorted(collector(), key=lambda gauge: gauge[0])
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {e}")
+                continue
+            for name, labels, value in gauges:
+                if name not in seen:
+                    seen.add(name)
+                    lines.append(f'# TYPE {name} gauge')
+                lines.append(f'{name}{format_labels(tuple(sorted(labels.items())))} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Shared metrics for the whole process
+metrics = Metrics()
+
+
+def start_metrics_server(port: int, registry: Metrics = metrics):
+    """Serve the metrics at http://127.0.0.1:<port>/metrics on a background thread."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(f"Metrics request: {format % args}")
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logger.info(f"Serving metrics at http://127.0.0.1:{server.server_port}/metrics")
+    return server
+
+
+def start_metrics_file(path: str, interval: float, registry: Metrics = metrics):
+    """Write the metrics to a file every interval seconds on a background thread."""
+    stop = threading.Event()
+
+    def write_loop():
+        while not stop.wait(interval):
+            try:
+                # Write to a temporary file first so readers never see a partial file
+                temp_path = f"{path}.tmp"
+                with open(temp_path, 'w') as f:
+                    f.write(registry.render())
+                os.replace(temp_path, path)
+            except Exception as e:
+                logger.error(f"Error writing metrics file {path}: {e}")
+
+    threading.Thread(target=write_loop, name="metrics-file", daemon=True).start()
+    logger.info(f"Writing metrics to {path} every {interval:g}s")
+    return stop
@@ -0,0 +1,145 @@
+import json
+import time
+import zlib
+import logging
+import threading
+
+from api_client import FetchResult
+
+logger = logging.getLogger(__name__)
+
+# Version of the record layout: a JSON header line followed by `length` bytes of zlib-compressed body
+RECORD_VERSION = 1
+
+# Record kinds: a response with a body, a 304 and a body identical to the previous one (not stored again)
+BODY = 'body'
+NOT_MODIFIED = 'not_modified'
+UNCHANGED = 'unchanged'
+
+
+class RecordedResponse:
+    """One API response read back from a response log."""
+
+    __slots__ = ('source', 'timestamp', 'latency', 'status', 'kind', 'fingerprint', 'content')
+
+    def __init__(self, source: str, timestamp: float, latency: float, status: int, kind: str,
+                 fingerprint: str = None, content: bytes = b''):
+        self.source = source
+        self.timestamp = timestamp  # Wall clock time the request was sent
+        self.latency = latency  # Seconds the request took
+        self.status = status
+        self.kind = kind
+        self.fingerprint = fingerprint
+        self.content = content
+
+    def result(self) -> FetchResult:
+        """Return the response as the client returned it when it was recorded."""
+        return FetchResult(self.status, self.content, not_modified=self.kind == NOT_MODIFIED, elapsed=self.latency,
+                           fingerprint=self.fingerprint, unchanged=self.kind == UNCHANGED)
+
+
+class ResponseRecorder:
+    """Appends the raw API responses of all sources to a log file, to be replayed later.
+
+    Bodies are compressed, and responses that did not change are stored without their body.
+    Every record is flushed as it is written, so the log survives the application being killed.
+    """
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level  # zlib compression level
+        self.lock = threading.Lock()  # Update threads of all sources write to the same file
+        self.file = open(path, 'ab')
+        self.stats = {'records': 0, 'bytes': 0, 'body_bytes': 0}
+
+    def record(self, source_name: str, result: FetchResult, timestamp: float):
+        """Append a fetch result of a source, with the time its request was sent."""
+        if result.not_modified:
+            kind, body = NOT_MODIFIED, b''
+        elif result.unchanged:
+            kind, body = UNCHANGED, b''
+        else:
+            kind, body = BODY, zlib.compress(result.content, self.level)
+        header = {
+            'version': RECORD_VERSION,
+            'source': source_name,
+            'timestamp': round(timestamp, 3),
+            'latency': round(result.elapsed, 4),
+            'status': result.status,
+            'kind': kind,
+            'fingerprint': result.fingerprint,
+            'length': len(body),
+        }
+        record = json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n' + body
+        with self.lock:
+            if self.file is None:
+                return
+            try:
+                self.file.write(record)
+                self.file.flush()
+            except OSError as e:
+                logger.error(f"Error writing response log {self.path}: {e}")
+                return
+            self.stats['records'] += 1
+            self.stats['bytes'] += len(record)
+            self.stats['body_bytes'] += len(result.content)
+
+    def close(self):
+        """Close the log file."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def read_responses(path: str):
+    """Yield the responses recorded in a log file in order.
+
+    Reading stops with a warning at a truncated or unreadable record, e.g. the last one of a log whose
+    application was killed while writing it.
+    """
+    with open(path, 'rb') as f:
+        index = 0
+        while True:
+            line = f.readline()
+            if not line:
+                return
+            try:
+                header = json.loads(line)
+                length = int(header['length'])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Stopping at unreadable record {index} of {path}: {e}")
+                return
+            body = f.read(length)
+            if len(body) < length:
+                logger.warning(f"Stopping at truncated record {index} of {path}")
+                return
+            index += 1
+            if header.get('version') != RECORD_VERSION:
+                logger.warning(f"Skipping record {index - 1} of {path} with unknown version {header.get('version')}")
+                continue
+            try:
+                yield RecordedResponse(header['source'], float(header['timestamp']), float(header['latency']),
+                                       int(header['status']), header['kind'], header.get('fingerprint'),
+                                       zlib.decompress(body) if body else b'')
+            except (ValueError, KeyError, TypeError, zlib.error) as e:
+                logger.warning(f"Skipping unreadable record {index - 1} of {path}: {e}")
+
+
+def paced(responses, speed: float, stop: threading.Event):
+    """Yield recorded responses at the times they arrived, sped up by `speed`, or without waiting if it is 0.
+
+    Stops when `stop` is set.
+    """
+    start = None  # (perf_counter, recorded arrival time) of the first response
+    for response in responses:
+        if stop.is_set():
+            return
+        arrived = response.timestamp + response.latency
+        if speed > 0:
+            if start is None:
+                start = (time.perf_counter(), arrived)
+            delay = start[0] + (arrived - start[1]) / speed - time.perf_counter()
+            if delay > 0 and stop.wait(delay):
+                return
+        yield response
@@ -0,0 +1,67 @@
+import time
+import random
+import threading
+
+
+class PollScheduler:
+    """Decides when to poll next: adaptive intervals, exponential backoff on errors and jitter.
+
+    Waiting is interruptible with wake(), so a reload, quit or "refresh now" takes effect immediately.
+    The clock and random generator can be replaced to make the delays deterministic.
+    """
+
+    def __init__(self, interval: float, min_interval: float = None, max_interval: float = None,
+                 error_delay: float = 5.0, max_backoff: float = 300.0, jitter: float = 0.1,
+                 clock=time.monotonic, rng=None):
+        self.interval = interval
+        self.min_interval = min(min_interval or interval, interval)
+        self.max_interval = max(max_interval or interval, interval)
+        self.error_delay = error_delay
+        self.max_backoff = max(max_backoff, error_delay)
+        self.jitter = jitter
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.current_interval = interval
+        self.failures = 0
+        self.deadline = clock()
+        self.event = threading.Event()
+
+    def record_success(self, changed: bool):
+        """Adapt the interval after a successful poll: faster while values change, slower while stable."""
+        self.failures = 0
+        if changed:
+            self.current_interval = max(self.min_interval, self.current_interval / 2)
+        else:
+            self.current_interval = min(self.max_interval, self.current_interval * 1.5)
+
+    def record_failure(self):
+        """Count a failed poll so the next delay backs off exponentially."""
+        self.failures += 1
+
+    def base_delay(self) -> float:
+        """Return the delay before the next poll without jitter."""
+        if self.failures:
+            return min(self.max_backoff, self.error_delay * 2 ** (self.failures - 1))
+        return self.current_interval
+
+    def next_delay(self, base: float = None) -> float:
+        """Return the jittered delay before the next poll and set the deadline for wait()."""
+        delay = self.base_delay() if base is None else base
+        if self.jitter:
+            delay *= 1 + self.rng.uniform(-self.jitter, self.jitter)
+        self.deadline = self.clock() + delay
+        return delay
+
+    def remaining(self) -> float:
+        """Return the seconds left until the deadline set by next_delay()."""
+        return max(0.0, self.deadline - self.clock())
+
+    def wait(self) -> bool:
+        """Wait until the deadline set by next_delay(), returning True if woken early by wake()."""
+        woken = self.event.wait(self.remaining())
+        self.event.clear()
+        return woken
+
+    def wake(self):
+        """Interrupt the current wait so the next poll happens now."""
+        self.event.set()
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import hashlib
+import logging
+
+from api_client import ApiClient, FetchResult, STREAM_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Version of the cache file layout: a JSON header line followed by the raw response body
+CACHE_VERSION = 1
+
+
+def cache_key(url: str, headers: dict) -> str:
+    """Return the name under which instances with the same URL and headers share responses."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(url.encode('utf-8'))
+    for name, value in sorted(headers.items()):
+        digest.update(f"\n{name}: {value}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def try_lock(file) -> bool:
+    """Take an exclusive lock on an open file without waiting. The OS releases it when the process exits."""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+class SharedApiClient(ApiClient):
+    """ApiClient that shares responses with the other instances on the machine through a cache directory.
+
+    The instance holding the lock file fetches the API and publishes every response with its timestamp, the
+    others read the published copy. When the fetching instance exits, the OS releases its lock and the next
+    instance to poll takes over. A copy older than `max_age` is never used: an instance that finds one while
+    another holds the lock fetches the API itself.
+    """
+
+    def __init__(self, url: str, headers: dict = None, connect_timeout: float = 5.0, read_timeout: float = 10.0,
+                 pool_size: int = 2, directory: str = '.', max_age: float = 60.0):
+        super().__init__(url, headers, connect_timeout, read_timeout, pool_size)
+        key = cache_key(url, self.headers)
+        self.cache_path = os.path.join(directory, f"{key}.cache")
+        self.lock_path = os.path.join(directory, f"{key}.lock")
+        self.max_age = max_age
+        self.lock_file = None  # Open and locked while this instance fetches for the others
+        self.published = None  # (body, fingerprint) last published, published again after a 304
+        self.stats.update({'shared_reads': 0, 'published': 0, 'direct': 0})
+
+    @property
+    def fetcher(self) -> bool:
+        return self.lock_file is not None
+
+    def acquire(self) -> bool:
+        """Become the instance that fetches for all others if no other instance is, and return whether this one is."""
+        if self.lock_file is not None:
+            return True
+        try:
+            os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+            lock_file = open(self.lock_path, 'a+b')
+        except OSError as e:
+            logger.error(f"Cannot open shared cache lock {self.lock_path}: {e}")
+            return False
+        if not try_lock(lock_file):
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        self.published = None
+        # The first response has to have a body to publish
+        self.etag = None
+        self.last_modified = None
+        logger.info(f"Fetching {self.url} for all instances sharing {self.cache_path}")
+        return True
+
+    def release(self):
+        """Stop fetching for the other instances."""
+        if self.lock_file is not None:
+            self.lock_file.close()  # Closing the file releases the lock
+            self.lock_file = None
+
+    def fetch(self, extractor=None) -> FetchResult:
+        """Fetch and publish the API response if this instance holds the lock, otherwise read the published copy."""
+        if self.acquire():
+            return self.fetch_and_publish(extractor)
+        result = self.read_cache(extractor)
+        if result is not None:
+            return result
+        # The copy is missing or stale although another instance holds the lock, so do not wait for it
+        self.stats['direct'] += 1
+        logger.debug("Shared cache %s is missing or stale, fetching %s directly", self.cache_path, self.url)
+        return super().fetch(extractor)
+
+    def fetch_and_publish(self, extractor=None) -> FetchResult:
+        """Fetch the whole response, publish it and return it, with the values extracted if an extractor is given."""
+        result = super().fetch()
+        if result.not_modified:
+            if self.published is not None:
+                self.publish(*self.published)  # Still current, only the timestamp changes
+            return result
+        self.published = (result.content, result.fingerprint)
+        self.publish(result.content, result.fingerprint)
+        if extractor is not None:
+            result.values, result.errors = extractor.extract_stream((result.content,))
+        return result
+
+    def publish(self, content: bytes, content_fingerprint: str):
+        """Replace the cache file with a response body and the current time."""
+        header = {'version': CACHE_VERSION, 'timestamp': time.time(), 'fingerprint': content_fingerprint}
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(json.dumps(header).encode('utf-8') + b'\n')
+                f.write(content)
+            for attempt in range(5):
+                try:
+                    os.replace(temp_path, self.cache_path)
+                    break
+                except PermissionError:
+                    # On Windows the file cannot be replaced while another instance is reading it
+                    if attempt == 4:
+                        raise
+                    time.sleep(0.01)
+            self.stats['published'] += 1
+        except OSError as e:
+            logger.error(f"Error publishing to shared cache {self.cache_path}: {e}")
+
+    def read_cache(self, extractor=None):
+        """Return the published response as a FetchResult, or None if there is none younger than max_age."""
+        start = time.perf_counter()
+        try:
+            f = open(self.cache_path, 'rb')
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Cannot read shared cache {self.cache_path}: {e}")
+            return None
+        with f:
+            try:
+                header = json.loads(f.readline())
+                if header.get('version') != CACHE_VERSION:
+                    return None
+                age = time.time() - float(header['timestamp'])
+                content_fingerprint = header['fingerprint']
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                logger.warning(f"Ignoring unreadable shared cache {self.cache_path}: {e}")
+                return None
+            if age > self.max_age:
+                return None
+            self.stats['shared_reads'] += 1
+
+            # The body only has to be read if it differs from the one this instance saw last
+            if content_fingerprint == self.last_fingerprint:
+                return FetchResult(200, elapsed=time.perf_counter() - start, fingerprint=content_fingerprint,
+                                   unchanged=True)
+            if extractor is not None:
+                values, errors = extractor.extract_stream(iter(lambda: f.read(STREAM_CHUNK_SIZE), b''))
+                content = b''
+            else:
+                values = errors = None
+                content = f.read()
+        self.last_fingerprint = content_fingerprint
+        return FetchResult(200, content, elapsed=time.perf_counter() - start, fingerprint=content_fingerprint,
+                           values=values, errors=errors)
+
+    def connection_stats(self) -> dict:
+        """Return the request counters, the shared cache counters and whether this instance is the fetcher."""
+        stats = super().connection_stats()
+        stats['fetcher'] = int(self.fetcher)  # Exported as a gauge, which has to be a number
+        return stats
+
+    def close(self):
+        """Release the lock, letting another instance take over, and close the session."""
+        self.release()
+        super().close()
@@ -0,0 +1,96 @@
+import os
+import json
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Format version of the snapshot file, files of other versions are ignored
+SNAPSHOT_VERSION = 1
+
+
+class Snapshot:
+    """Last known icon values and response fingerprints, kept in a small JSON file for the next start."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.icons = {}  # Icon ID -> {'source', 'path', 'value', 'timestamp'}
+        self.sources = {}  # Source name -> {'url', 'fingerprint'}
+        self.dirty = False
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def load(self) -> bool:
+        """Read the snapshot file, starting empty if it is missing or unreadable."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != SNAPSHOT_VERSION:
+                logger.warning(f"Ignoring snapshot {self.path} with unsupported version {data.get('version')}")
+                return False
+            with self.lock:
+                self.icons = dict(data.get('icons', {}))
+                self.sources = dict(data.get('sources', {}))
+            logger.info(f"Loaded last known values of {len(self.icons)} icon(s) from {self.path}")
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot {self.path}: {e}")
+            return False
+
+    def icon(self, icon_id: str, source: str, path: str):
+        """Return the saved entry of an icon if it still reads the same path from the same source."""
+        with self.lock:
+            entry = self.icons.get(icon_id)
+        if entry and entry.get('source') == source and entry.get('path') == path and 'value' in entry:
+            return entry
+        return None
+
+    def fingerprint(self, source: str, url: str):
+        """Return the fingerprint of the last response saved for a source, if its URL is unchanged."""
+        with self.lock:
+            entry = self.sources.get(source)
+        if entry and entry.get('url') == url:
+            return entry.get('fingerprint')
+        return None
+
+    def set_icon(self, icon_id: str, source: str, path: str, value: str, timestamp: float):
+        """Record the value of an icon; only a changed value makes the snapshot need saving."""
+        with self.lock:
+            entry = self.icons.get(icon_id)
+            if entry and entry.get('value') == value and entry.get('source') == source and entry.get('path') == path:
+                entry['timestamp'] = timestamp
+                return
+            self.icons[icon_id] = {'source': source, 'path': path, 'value': value, 'timestamp': timestamp}
+            self.dirty = True
+
+    def set_source(self, source: str, url: str, fingerprint: str):
+        """Record the fingerprint of the response the values of a source came from."""
+        with self.lock:
+            self.sources[source] = {'url': url, 'fingerprint': fingerprint}
+
+    def remove_icon(self, icon_id: str):
+        """Forget an icon that no longer exists."""
+        with self.lock:
+            if self.icons.pop(icon_id, None) is not None:
+                self.dirty = True
+
+    def save(self) -> bool:
+        """Write the snapshot if it changed, replacing the file atomically."""
+        with self.lock:
+            if not self.dirty:
+                return False
+            data = {'version': SNAPSHOT_VERSION, 'sources': self.sources, 'icons': self.icons}
+            try:
+                # Write to a temporary file first so a crash never leaves a partial snapshot
+                temp_path = f"{self.path}.tmp"
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, separators=(',', ':'))
+                os.replace(temp_path, self.path)
+                self.dirty = False
+                self.writes += 1
+                return True
+            except Exception as e:
+                logger.error(f"Error writing snapshot {self.path}: {e}")
+                return False
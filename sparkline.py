@@ -0,0 +1,108 @@
+import logging
+import threading
+import numpy as np
+from PIL import Image, ImageDraw
+
+from icon_renderer import IconRenderer, font_cache
+from glyph_renderer import rgba_array_to_dib
+
+logger = logging.getLogger(__name__)
+
+
+def downsample(timestamps, values, now: float, window: float, columns: int) -> np.ndarray:
+    """Average the samples into `columns` equal time slots covering the window that ends at now.
+
+    A value holds until the next sample, so slots without samples repeat the previous value.
+    Slots before the first sample are NaN.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    start = now - window
+    means = np.full(columns, np.nan)
+    if not len(timestamps):
+        return means
+
+    # The last sample before the window carries its value into the first slots
+    before = np.flatnonzero(timestamps <= start)
+    if len(before):
+        means[0] = values[before[-1]]
+
+    inside = (timestamps > start) & (timestamps <= now) & np.isfinite(values)
+    slots = np.minimum(((timestamps[inside] - start) / window * columns).astype(np.int64), columns - 1)
+    counts = np.bincount(slots, minlength=columns)
+    sums = np.bincount(slots, weights=values[inside], minlength=columns)
+    filled = counts > 0
+    means[filled] = sums[filled] / counts[filled]
+
+    # Carry each value forward into the following empty slots
+    known = ~np.isnan(means)
+    last = np.maximum.accumulate(np.where(known, np.arange(columns), -1))
+    return np.where(last >= 0, means[np.maximum(last, 0)], np.nan)
+
+
+def bar_heights(means: np.ndarray, height: int) -> np.ndarray:
+    """Scale slot averages to bar heights between 1 and height pixels, 0 for slots without data."""
+    known = ~np.isnan(means)
+    heights = np.zeros(len(means), dtype=np.uint8)
+    if not known.any():
+        return heights
+    low = min(0.0, float(means[known].min()))
+    high = float(means[known].max())
+    if high > low:
+        scaled = np.rint((means[known] - low) / (high - low) * height)
+    else:
+        scaled = np.full(known.sum(), height if high else 1)
+    heights[known] = np.clip(scaled, 1, height)
+    return heights
+
+
+class SparklineRenderer(IconRenderer):
+    """Draws the label above a bar chart of an icon's recent values.
+
+    The content passed to draw() and render() is the chart returned by chart(), one bar height per column.
+    """
+
+    chart_top = 14  # First row of the chart, below the label
+
+    def __init__(self, font_path: str, label_font_size: int):
+        self.font_path = font_path
+        self.label_font_size = label_font_size
+        self.labels = {}  # Label -> alpha array with only the label drawn
+        self.lock = threading.Lock()
+
+    def style_key(self) -> tuple:
+        return super().style_key() + (self.font_path, self.label_font_size)
+
+    def chart(self, timestamps, values, now: float, window: float) -> bytes:
+        """Downsample samples from the last window seconds to one bar height per pixel column."""
+        means = downsample(timestamps, values, now, window, self.size)
+        return bar_heights(means, self.size - self.chart_top).tobytes()
+
+    def label_layer(self, label: str) -> np.ndarray:
+        """Return the alpha channel of an icon with only the label drawn, drawn on first use."""
+        with self.lock:
+            layer = self.labels.get(label)
+            if layer is None:
+                font = font_cache.get(self.font_path, self.label_font_size)
+                image = Image.new('L', (self.size, self.size), 0)
+                draw = ImageDraw.Draw(image)
+                label_width = draw.textlength(label, font=font)
+                draw.text(((self.size - label_width) // 2, 1), label, fill=255, font=font)
+                layer = self.labels[label] = np.asarray(image, dtype=np.uint8)
+            return layer
+
+    def draw_array(self, label: str, chart: bytes) -> np.ndarray:
+        """Draw the label and the bars and return the icon as a (size, size, 4) RGBA array."""
+        heights = np.frombuffer(chart, dtype=np.uint8)
+        rows = np.arange(self.size)[:, None]
+        bars = (rows >= self.size - heights[None, :]) & (rows >= self.chart_top)
+
+        pixels = np.zeros((self.size, self.size, 4), dtype=np.uint8)
+        pixels[:, :, 3] = np.where(bars, 255, self.label_layer(label))
+        return pixels
+
+    def draw(self, label: str, chart: bytes) -> bytes:
+        return self.draw_array(label, chart).tobytes()
+
+    def render(self, label: str, chart: bytes) -> bytes:
+        return rgba_array_to_dib(self.draw_array(label, chart))
@@ -0,0 +1,42 @@
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """Records how long each import and initialization phase of the startup takes."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = []  # (name, seconds) in the order they finished
+        self.milestones = []  # (name, seconds since start)
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as a named phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name: str):
+        """Record the time since the start of the process under a name, once."""
+        if not any(milestone == name for milestone, _ in self.milestones):
+            self.milestones.append((name, time.perf_counter() - self.start))
+
+    def report(self) -> str:
+        """Return a table of all phases and milestones."""
+        width = max([len(name) for name, _ in self.phases + self.milestones] + [5])
+        lines = ["Startup profile:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<{width}}  {seconds * 1000:8.1f} ms")
+        for name, seconds in self.milestones:
+            lines.append(f"  {name:<{width}}  {seconds * 1000:8.1f} ms after start")
+        return '\n'.join(lines)
+
+
+# Profile of the current process, started when this module is first imported
+profile = StartupProfile()
@@ -0,0 +1,144 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def parse_sse(lines):
+    """Parse Server-Sent Events from an iterable of text lines.
+
+    Yields (event_id, data, retry) tuples. event_id is the last event ID, which an `id` field sets at the
+    blank line ending its block. A block without data yields data None if it changed the ID. A `retry` field
+    takes effect when it is read: it is yielded right away as the reconnect delay in seconds, with data None.
+    A block not ended by a blank line when the lines run out is dropped, as the stream was cut inside it.
+    """
+    data = []
+    event_id = None  # Last event ID, dispatched
+    id_buffer = None  # ID set by the current block, dispatched at its end
+    for line in lines:
+        if line == '':
+            # A blank line dispatches the event
+            if id_buffer is not None:
+                changed = id_buffer != event_id
+                event_id = id_buffer
+                id_buffer = None
+                if changed and not data:
+                    yield event_id, None, None
+            if data:
+                yield event_id, '\n'.join(data), None
+            data = []
+            continue
+        if line.startswith(':'):
+            continue  # Comment / heartbeat
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            data.append(value)
+        elif field == 'id' and '\0' not in value:
+            id_buffer = value
+        elif field == 'retry' and value.isdigit():
+            yield event_id, None, int(value) / 1000
+
+
+def parse_ndjson(lines):
+    """Parse line-delimited JSON, yielding (None, line, None) tuples like parse_sse."""
+    for line in lines:
+        if line.strip():
+            yield None, line, None
+
+
+def iter_stream_lines(response):
+    """Yield decoded lines from a streaming response as soon as each line has arrived."""
+    raw = response.raw
+    if not hasattr(raw, 'read1'):
+        # Older urllib3: chunk_size=None still hands over each HTTP chunk as it arrives
+        yield from response.iter_lines(chunk_size=None, decode_unicode=True)
+        return
+    buffer = b''
+    while True:
+        chunk = raw.read1(65536, decode_content=True)
+        if not chunk:
+            break
+        buffer += chunk
+        lines = buffer.split(b'\n')
+        buffer = lines.pop()
+        for line in lines:
+            yield line.rstrip(b'\r').decode('utf-8')
+    if buffer:
+        yield buffer.rstrip(b'\r').decode('utf-8')
+
+
+class StreamClient:
+    """Holds a long-lived streaming connection (SSE or NDJSON) and yields decoded documents."""
+
+    def __init__(self, url: str, headers: dict = None, connect_timeout: float = 5.0, read_timeout: float = 60.0):
+        self.url = url
+        self.headers = headers or {}
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = None  # Created on the first connection, on the update thread
+        self.last_event_id = None
+        self.retry_delay = None  # Reconnect delay requested by the server
+        self.response = None
+        self.stats = {'connections': 0, 'events': 0, 'errors': 0}
+
+    def create_session(self):
+        """Create the session (imports requests on first use to keep startup fast)."""
+        import requests
+
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.headers['Accept'] = 'text/event-stream, application/x-ndjson'
+
+    def events(self):
+        """Connect and yield each received JSON document until the stream ends."""
+        if self.session is None:
+            self.create_session()
+
+        headers = {}
+        if self.last_event_id is not None:
+            # Ask the server to resume after the last event we saw
+            headers['Last-Event-ID'] = self.last_event_id
+
+        self.response = self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout)
+        try:
+            self.response.raise_for_status()
+            self.stats['connections'] += 1
+            content_type = self.response.headers.get('Content-Type', '')
+            lines = iter_stream_lines(self.response)
+            parser = parse_sse if 'text/event-stream' in content_type else parse_ndjson
+            logger.info(f"Connected to stream {self.url} ({content_type or 'unknown content type'})")
+
+            for event_id, data, retry in parser(lines):
+                if retry is not None:
+                    self.retry_delay = retry
+                if data is None:
+                    # A block with only a retry or id field: nothing to apply
+                    if event_id is not None:
+                        self.last_event_id = event_id
+                    continue
+                try:
+                    document = json.loads(data)
+                except ValueError as e:
+                    self.stats['errors'] += 1
+                    logger.error(f"Invalid JSON in stream event: {e}")
+                    continue
+                if event_id is not None:
+                    self.last_event_id = event_id
+                self.stats['events'] += 1
+                yield document
+        finally:
+            self.response.close()
+            self.response = None
+
+    def close(self):
+        """Close the active connection, ending a blocked events() iteration."""
+        response = self.response
+        if response is not None:
+            response.close()
+        if self.session is not None:
+            self.session.close()
+
+    def connection_stats(self) -> dict:
+        """Return connection, event and error counters."""
+        return dict(self.stats)
@@ -1,31 +1,69 @@
-import win32gui
-import win32con
-import win32api
 import time
 import threading
 import logging
-from PIL import Image, ImageDraw, ImageFont
+import logging.handlers
+import queue
 import os
-import requests
 import sys
-import watchdog.observers
-import watchdog.events
-import winshell
-from win32com.client import Dispatch
-from ctypes import wintypes, Structure, c_int, c_uint, c_void_p, sizeof, byref, create_unicode_buffer, windll
-from dotenv import load_dotenv
-from datetime import datetime
+from startup_profile import profile
+with profile.phase("import pywin32"):
+    import win32gui
+    import win32con
+    import win32api
+from ctypes import wintypes, c_int, c_uint, c_void_p, c_char_p, byref, create_unicode_buffer, windll
+with profile.phase("import dotenv"):
+    from dotenv import load_dotenv
+from log_utils import RateLimitFilter
+with profile.phase("import icon_renderer (Pillow)"):
+    from icon_renderer import PillowRenderer, font_cache
+with profile.phase("import application modules"):
+    from icon_cache import IconCache
+    from icon_state import IconState
+    from history import History
+    from snapshot import Snapshot
+    from json_paths import PathExtractor
+    from api_client import ApiClient
+    from shared_cache import SharedApiClient
+    from stream_client import StreamClient
+    from config import load_config, read_env_file, source_paths, DEFAULT_SOURCE
+    from scheduler import PollScheduler
+    from metrics import metrics, start_metrics_server, start_metrics_file
+    from update_queue import CoalescingQueue
+    from recording import ResponseRecorder, read_responses, paced
+# winshell, win32com and watchdog are only needed for autorun and the .env watcher and
+# requests only on the update threads, so they are imported on first use
 
 logger = logging.getLogger(__name__)
 
+# Remember the process environment before the .env file is applied, for config reloads
+base_environ = dict(os.environ)
+
 # Load environment variables
-load_dotenv()
+with profile.phase("load .env"):
+    load_dotenv()
 
 # Version information
 VERSION = "1.0.3"
 
+# Rendered sparkline charts kept for reuse. A moving chart rarely repeats, so charts have their own small
+# cache instead of evicting text icons from the shared one
+CHART_CACHE_SIZE = 8
+
+# Messages posted to the window by other threads, handled on the message loop thread
+WM_APPLY_UPDATES = win32con.WM_USER + 21
+WM_RELOAD_CONFIG = win32con.WM_USER + 22
+
+# Background thread that writes queued log records, set up by setup_logging()
+log_listener = None
+log_rate_limit = None
+
 def setup_logging(log_to_file=False):
-    """Set up logging configuration."""
+    """Set up logging configuration.
+    
+    Records are handed to a queue and written by a background thread, so console and file I/O
+    stay off the update threads. Repeated identical warnings and errors are rate-limited.
+    """
+    global log_listener, log_rate_limit
     log_format = '%(asctime)s - %(levelname)s - %(message)s'
     handlers = []
     
@@ -34,80 +72,431 @@ def setup_logging(log_to_file=False):
     console_handler.setFormatter(logging.Formatter(log_format))
     handlers.append(console_handler)
     
-    # File handler if requested
+    # Size-based rotating file handler if requested
     if log_to_file:
         log_dir = os.path.join(os.path.dirname(os.path.abspath(sys.argv[0])), 'logs')
         os.makedirs(log_dir, exist_ok=True)
-        log_file = os.path.join(log_dir, f'systray_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
-        file_handler = logging.FileHandler(log_file)
+        file_handler = logging.handlers.RotatingFileHandler(
+            os.path.join(log_dir, 'systray.log'),
+            maxBytes=int(os.getenv('LOG_MAX_BYTES', str(1024 * 1024))),
+            backupCount=int(os.getenv('LOG_BACKUP_COUNT', '5')),
+            encoding='utf-8'
+        )
         file_handler.setFormatter(logging.Formatter(log_format))
         handlers.append(file_handler)
     
+    # Queue records on the calling thread and write them on the listener thread
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))  # Only merge the arguments into the message
+    log_rate_limit = RateLimitFilter(float(os.getenv('LOG_REPEAT_INTERVAL', '3600')))
+    queue_handler.addFilter(log_rate_limit)
+    log_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    log_listener.start()
+    
     # Configure root logger
     logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        handlers=handlers
+        level=getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO),
+        handlers=[queue_handler]
     )
 
+def shutdown_logging():
+    """Report suppressed repeats and write out all queued log records."""
+    global log_listener, log_rate_limit
+    if log_rate_limit:
+        summaries = log_rate_limit.summaries()
+        log_rate_limit = None
+        for level, message in summaries:
+            logger.log(level, message)
+    if log_listener:
+        log_listener.stop()
+        log_listener = None
+
 # Define Shell_NotifyIconW function
 Shell_NotifyIconW = windll.shell32.Shell_NotifyIconW
 Shell_NotifyIconW.argtypes = [c_uint, c_void_p]
 Shell_NotifyIconW.restype = c_int
 
-class NOTIFYICONDATA(Structure):
-    _fields_ = [
-        ('cbSize', c_uint),
-        ('hWnd', wintypes.HWND),
-        ('uID', c_uint),
-        ('uFlags', c_uint),
-        ('uCallbackMessage', c_uint),
-        ('hIcon', wintypes.HICON),
-        ('szTip', wintypes.WCHAR * 128)
-    ]
-
-class EnvFileHandler(watchdog.events.FileSystemEventHandler):
-    def __init__(self, callback):
+# Define CreateIconFromResourceEx function (creates an icon from in-memory DIB bytes)
+CreateIconFromResourceEx = windll.user32.CreateIconFromResourceEx
+CreateIconFromResourceEx.argtypes = [c_char_p, wintypes.DWORD, wintypes.BOOL, wintypes.DWORD, c_int, c_int, c_uint]
+CreateIconFromResourceEx.restype = wintypes.HICON
+
+def option_value(name: str, default=None):
+    """Return the value following a command line option, or the default if the option is not given."""
+    if name not in sys.argv:
+        return default
+    index = sys.argv.index(name) + 1
+    if index >= len(sys.argv) or sys.argv[index].startswith("--"):
+        sys.exit(f"{name} needs a value")
+    return sys.argv[index]
+
+class EnvFileHandler:
+    """Watchdog event handler that calls back once the .env file has been saved."""
+
+    def __init__(self, env_path, callback, delay=0.3):
+        self.env_path = os.path.normcase(env_path)
         self.callback = callback
-        self.last_modified = time.time()
+        self.delay = delay
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def is_env_file(self, path):
+        """Check whether an event path is the watched .env file."""
+        return bool(path) and os.path.normcase(os.path.abspath(path)) == self.env_path
 
-    def on_modified(self, event):
-        if event.src_path.endswith('.env'):
-            # Debounce multiple events
-            current_time = time.time()
-            if current_time - self.last_modified > 1:  # 1 second debounce
-                self.last_modified = current_time
-                self.callback()
+    def dispatch(self, event):
+        # Editors save by writing in place or by replacing the file, so also check the move target
+        if not (self.is_env_file(event.src_path) or self.is_env_file(getattr(event, 'dest_path', None))):
+            return
+        if event.event_type not in ('modified', 'created', 'moved'):
+            return
+        # Debounce: run the callback once the events for a save have settled
+        with self.lock:
+            if self.timer:
+                self.timer.cancel()
+            self.timer = threading.Timer(self.delay, self.callback)
+            self.timer.daemon = True
+            self.timer.start()
 
 class SystemTray:
-    def __init__(self, config):
+    def __init__(self, config, profile_startup=False, record_file=None, replay_file=None, replay_speed=1.0):
         self.config = config
         self.hwnd = None
         self.wc = None
         self.icons = {}
-        self.update_thread = None
+        self.update_stats = {'applied': 0, 'tooltip_only': 0, 'skipped': 0}
+        self.update_threads = []
         self.running = False
-        self.autorun_enabled = self.is_autorun_enabled()
-        self.initialize_window()
-        self.start_env_watcher()
+        self.next_uid = 0
+        self.env_path = os.path.abspath('.env')
+        self.config_digest = None
+        self.reload_lock = threading.Lock()
+        self.renderer = self.create_renderer(config['render'])
+        self.sparkline_renderer = None  # Created when first needed, False if NumPy is missing
+        with profile.phase("load snapshot"):
+            self.snapshot = self.create_snapshot(config['snapshot_file'])
+        self.recorder = ResponseRecorder(record_file) if record_file else None
+        self.sources = {}
+        for name, source_config in config['sources'].items():
+            self.add_source(name, source_config, config)
+        self.icon_cache = IconCache(config['icon_cache_size'], release=win32gui.DestroyIcon)
+        self.chart_cache = IconCache(CHART_CACHE_SIZE, release=win32gui.DestroyIcon)
+        self.profile_startup = profile_startup
+        self.startup_failures = set()  # Sources whose fetches failed before any value was shown
+        self.startup_lock = threading.Lock()
+        self.icons_ready = threading.Event()  # Set once the icons exist, before values are applied
+        self.update_queue = CoalescingQueue()  # Newest pending (value, tooltip) per icon for the message loop
+        self.marshal_updates = False  # Set when the message loop runs; until then updates are applied directly
+        self.autorun_enabled = None  # Checked when the menu is first shown
+        self.metrics_collector = False  # Set once collect_metrics() is registered
+        self.metrics_server = None
+        self.metrics_file_stop = None  # Event stopping the metrics file writer
+        self.replay_file = replay_file  # Responses are read from this log instead of fetched
+        self.replay_speed = replay_speed  # 1 replays in real time, 0 as fast as possible
+        self.replay_stop = threading.Event()
+        with profile.phase("initialize window"):
+            self.initialize_window()
+
+    def create_renderer(self, render_config: dict) -> PillowRenderer:
+        """Create the icon renderer for the renderer and font settings."""
+        renderer_class = PillowRenderer
+        if render_config['renderer'] == 'glyph':
+            try:
+                with profile.phase("import glyph_renderer (NumPy)"):
+                    from glyph_renderer import GlyphRenderer
+                renderer_class = GlyphRenderer
+            except ImportError as e:
+                logger.warning(f"Glyph renderer unavailable ({e}), using Pillow")
+        elif render_config['renderer'] != 'pillow':
+            logger.warning(f"Unknown renderer '{render_config['renderer']}', using Pillow")
+        return renderer_class(
+            render_config['font_path'],
+            render_config['label_font_size'],
+            render_config['value_font_size']
+        )
+
+    def load_sparkline_renderer(self):
+        """Return the renderer for sparkline icons, creating it on first use, or None if it is unavailable."""
+        if self.sparkline_renderer is None:
+            try:
+                with profile.phase("import sparkline (NumPy)"):
+                    from sparkline import SparklineRenderer
+                render_config = self.config['render']
+                self.sparkline_renderer = SparklineRenderer(render_config['font_path'],
+                                                            render_config['label_font_size'])
+            except ImportError as e:
+                logger.warning(f"Sparkline icons unavailable ({e}), showing values instead")
+                self.sparkline_renderer = False
+        return self.sparkline_renderer or None
+
+    def create_snapshot(self, path: str):
+        """Load the snapshot of last known values, or return None if snapshots are disabled."""
+        if not path:
+            return None
+        snapshot = Snapshot(path)
+        snapshot.load()
+        return snapshot
+
+    def add_source(self, name: str, source_config: dict, config: dict):
+        """Set up the client, path extractor and scheduler for a data source."""
+        if source_config['mode'] == 'stream':
+            client = StreamClient(
+                source_config['url'],
+                source_config['headers'],
+                source_config['connect_timeout'],
+                source_config['stream_timeout']
+            )
+        elif source_config['shared_cache_dir']:
+            # Other instances on the machine poll at most every max interval, plus jitter and the time a
+            # request may take; a published response older than that means no instance is fetching
+            interval = source_config['max_interval'] or source_config['poll_interval']
+            client = SharedApiClient(
+                source_config['url'],
+                source_config['headers'],
+                source_config['connect_timeout'],
+                source_config['read_timeout'],
+                directory=source_config['shared_cache_dir'],
+                max_age=interval * (1 + source_config['poll_jitter']) + source_config['connect_timeout']
+                + source_config['read_timeout']
+            )
+        else:
+            client = ApiClient(
+                source_config['url'],
+                source_config['headers'],
+                source_config['connect_timeout'],
+                source_config['read_timeout']
+            )
+        
+        if source_config['mode'] != 'stream' and self.recorder is None:
+            # If every icon of the source starts with its last known value, an identical first
+            # response does not need to be decoded again. Not when recording: the log has to start
+            # with a body to be replayable without the snapshot
+            fingerprint = self.snapshot.fingerprint(name, source_config['url']) if self.snapshot else None
+            if fingerprint and all(self.snapshot.icon(f"{label}_{path}", name, path)
+                                   for label, path, source in config['icons'] if source == name):
+                client.last_fingerprint = fingerprint
+        self.sources[name] = {
+            'config': source_config,
+            'client': client,
+            'extractor': PathExtractor(source_paths(config, name)),
+            'scheduler': PollScheduler(
+                source_config['poll_interval'],
+                source_config['min_interval'],
+                source_config['max_interval'],
+                max_backoff=source_config['retry_max_delay'],
+                jitter=source_config['poll_jitter']
+            ),
+            'active': True  # Cleared to stop the source's update thread
+        }
+
+    def start_source(self, name: str):
+        """Start the update thread for a data source."""
+        if self.replay_file:
+            return  # The replay thread applies the recorded responses of all sources
+        source = self.sources[name]
+        target = self.stream_loop if source['config']['mode'] == 'stream' else self.update_loop
+        update_thread = threading.Thread(target=target, args=(name,), name=f"update-{name}")
+        update_thread.daemon = True
+        update_thread.start()
+        self.update_threads.append(update_thread)
+
+    def stop_source(self, name: str):
+        """Stop the update thread of a data source and remove it."""
+        source = self.sources.pop(name)
+        source['active'] = False
+        source['scheduler'].wake()
+        logger.info(f"API client stats for source {name}: {source['client'].connection_stats()}")
+        source['client'].close()
+        self.update_threads = [thread for thread in self.update_threads if thread.is_alive()]
 
     def start_env_watcher(self):
         """Start watching the .env file for changes."""
         try:
-            env_path = os.path.abspath('.env')
-            if os.path.exists(env_path):
-                event_handler = EnvFileHandler(self.restart_application)
+            if os.path.exists(self.env_path):
+                import watchdog.observers
+                
+                _, self.config_digest = read_env_file(self.env_path, base_environ)
+                event_handler = EnvFileHandler(self.env_path, self.request_reload)
                 observer = watchdog.observers.Observer()
-                observer.schedule(event_handler, path=os.path.dirname(env_path), recursive=False)
+                observer.schedule(event_handler, path=os.path.dirname(self.env_path), recursive=False)
+                observer.daemon = True
                 observer.start()
                 logger.info("Started .env file watcher")
         except Exception as e:
             logger.error(f"Error starting .env file watcher: {e}")
 
-    def restart_application(self):
-        """Restart the application when .env file changes."""
-        logger.info("Detected .env file change, restarting application...")
+    def request_reload(self):
+        """Reload the configuration on the message loop thread, which owns the icons."""
+        if self.marshal_updates:
+            win32gui.PostMessage(self.hwnd, WM_RELOAD_CONFIG, 0, 0)
+        else:
+            self.reload_config()
+
+    def reload_config(self):
+        """Re-read the .env file and apply only what changed, without restarting."""
+        try:
+            start = time.perf_counter()
+            environ, digest = read_env_file(self.env_path, base_environ)
+            if digest == self.config_digest:
+                logger.info("Configuration file saved without changes, ignoring")
+                return
+            self.apply_config(load_config(environ))
+            self.config_digest = digest
+            logger.info(f"Reloaded configuration in {(time.perf_counter() - start) * 1000:.1f} ms")
+        except Exception as e:
+            logger.error(f"Error reloading configuration, restarting instead: {e}")
+            self.restart_application()
+
+    def apply_config(self, new_config: dict):
+        """Apply the differences between the current and a new configuration."""
+        with self.reload_lock:
+            old_config = self.config
+            
+            # Re-style icons if the font settings changed
+            restyle = new_config['render'] != old_config['render']
+            if restyle:
+                logger.info("Renderer or font settings changed, re-rendering icons")
+                self.renderer = self.create_renderer(new_config['render'])
+                self.sparkline_renderer = None
+                self.icon_cache.clear()
+                self.chart_cache.clear()
+            self.icon_cache.max_size = new_config['icon_cache_size']
+            if new_config['snapshot_file'] != old_config['snapshot_file']:
+                self.snapshot = self.create_snapshot(new_config['snapshot_file'])
+            
+            # Stop the metrics endpoint or file whose settings changed (started again below)
+            old_metrics, new_metrics = old_config['metrics'], new_config['metrics']
+            if new_metrics != old_metrics:
+                logger.info("Metrics settings changed, restarting metrics output")
+                self.stop_metrics(
+                    server=new_metrics['port'] != old_metrics['port'],
+                    file=(new_metrics['file'], new_metrics['file_interval']) !=
+                         (old_metrics['file'], old_metrics['file_interval'])
+                )
+            
+            # Stop sources that were removed or changed
+            for name in list(self.sources):
+                if new_config['sources'].get(name) != self.sources[name]['config']:
+                    logger.info(f"Stopping source {name}")
+                    self.stop_source(name)
+            
+            # Set up new and changed sources (their threads start once the icons are in place)
+            new_sources = [name for name in new_config['sources'] if name not in self.sources]
+            for name in new_sources:
+                logger.info(f"Starting source {name}")
+                self.add_source(name, new_config['sources'][name], new_config)
+            
+            self.config = new_config
+            if self.running:
+                self.start_metrics()
+            
+            # Remove, re-bind and add icons
+            old_icons = {label: (path, source) for label, path, source in old_config['icons']}
+            new_icons = {label: (path, source) for label, path, source in new_config['icons']}
+            touched_sources = set()
+            for icon_id, icon_info in list(self.icons.items()):
+                label = icon_info.label
+                if label not in new_icons:
+                    self.remove_icon(icon_id)
+                elif new_icons[label] != old_icons.get(label):
+                    path, source = new_icons[label]
+                    self.rebind_icon(icon_id, path, source)
+                    touched_sources.add(source)
+            for label, path, source in new_config['icons']:
+                if not any(icon_info.label == label for icon_info in self.icons.values()):
+                    self.create_icon(label, path, source)
+                    touched_sources.add(source)
+            
+            # Rebuild path extractors from the new icon paths
+            for name, source in self.sources.items():
+                source['extractor'] = PathExtractor(source_paths(new_config, name))
+            
+            # Re-draw icons whose style or sparkline setting changed and resize their histories
+            for icon_id, icon_info in list(self.icons.items()):
+                if icon_info.history.capacity != new_config['history_size']:
+                    icon_info.history = icon_info.history.resized(new_config['history_size'])
+                sparkline = new_config['sparklines'].get(icon_info.label)
+                if restyle or sparkline != icon_info.sparkline:
+                    icon_info.sparkline = sparkline
+                    icon_info.image = None  # Force a redraw
+                    self.update_icon(icon_id, icon_info.value, icon_info.tooltip)
+            
+            # Start new sources and fetch right away for sources with new icons
+            if self.running:
+                for name in new_sources:
+                    self.start_source(name)
+            for name in touched_sources - set(new_sources):
+                if name in self.sources:
+                    source = self.sources[name]
+                    if hasattr(source['client'], 'reset_fingerprint'):
+                        source['client'].reset_fingerprint()
+                    source['scheduler'].wake()
+
+    def collect_metrics(self) -> list:
+        """Return gauges for the update, cache and client counters."""
+        gauges = []
+        for result, count in self.update_stats.items():
+            gauges.append(('systray_icon_updates', {'result': result}, count))
+        for name, value in self.icon_cache.stats().items():
+            gauges.append((f'systray_icon_cache_{name}', {}, value))
+        for name, value in self.chart_cache.stats().items():
+            gauges.append((f'systray_chart_cache_{name}', {}, value))
+        for name, value in font_cache.stats().items():
+            gauges.append((f'systray_font_cache_{name}', {}, value))
+        for name, value in self.update_queue.stats().items():
+            gauges.append((f'systray_update_queue_{name}', {}, value))
+        for source_name, source in list(self.sources.items()):
+            for name, value in source['client'].connection_stats().items():
+                gauges.append((f'systray_source_{name}', {'source': source_name}, value))
+        return gauges
+
+    def start_metrics(self):
+        """Start the metrics endpoint and/or stats file if configured and not already running."""
+        metrics_config = self.config['metrics']
+        if not (metrics_config['port'] or metrics_config['file']):
+            return
+        if not self.metrics_collector:
+            metrics.add_collector(self.collect_metrics)
+            self.metrics_collector = True
+        try:
+            if metrics_config['port'] and self.metrics_server is None:
+                self.metrics_server = start_metrics_server(metrics_config['port'])
+            if metrics_config['file'] and self.metrics_file_stop is None:
+                self.metrics_file_stop = start_metrics_file(metrics_config['file'], metrics_config['file_interval'])
+        except Exception as e:
+            logger.error(f"Error starting metrics: {e}")
+
+    def stop_metrics(self, server: bool = True, file: bool = True):
+        """Stop the metrics endpoint and/or stats file."""
+        if server and self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
+        if file and self.metrics_file_stop is not None:
+            self.metrics_file_stop.set()
+            self.metrics_file_stop = None
+
+    def refresh_now(self):
+        """Poll all sources immediately."""
+        logger.info("Refreshing all sources")
+        for source in self.sources.values():
+            source['scheduler'].wake()
+
+    def stop_updates(self):
+        """Stop the update threads without waiting for their current delay to pass."""
         self.running = False
+        self.replay_stop.set()
+        for source in self.sources.values():
+            source['scheduler'].wake()
+            if source['config']['mode'] == 'stream':
+                # Unblock threads waiting for the next stream event
+                source['client'].close()
+
+    def restart_application(self):
+        """Restart the application as a new process."""
+        logger.info("Restarting application...")
+        self.stop_updates()
         # Use a separate thread to restart to avoid blocking
         threading.Thread(target=self._restart_thread).start()
 
@@ -119,6 +508,7 @@ class SystemTray:
             # Reload environment variables
             load_dotenv(override=True)
             # Start new process
+            shutdown_logging()
             python = sys.executable
             os.execl(python, python, *sys.argv)
         except Exception as e:
@@ -177,6 +567,8 @@ class SystemTray:
     def is_autorun_enabled(self) -> bool:
         """Check if the application is set to run at startup."""
         try:
+            import winshell
+            
             startup_folder = winshell.startup()
             shortcut_path = os.path.join(startup_folder, "SystemTrayMonitor.lnk")
             return os.path.exists(shortcut_path)
@@ -211,6 +603,11 @@ start /b "" "{pythonw_path}" "{script_path}"
     def toggle_autorun(self) -> bool:
         """Toggle autorun status for the current user using a Windows shortcut."""
         try:
+            import winshell
+            from win32com.client import Dispatch
+            
+            if self.autorun_enabled is None:
+                self.autorun_enabled = self.is_autorun_enabled()
             startup_folder = winshell.startup()
             shortcut_path = os.path.join(startup_folder, "SystemTrayMonitor.lnk")
             script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
@@ -249,7 +646,7 @@ start /b "" "{pythonw_path}" "{script_path}"
     def wnd_proc(self, hwnd, msg, wparam, lparam):
         """Window procedure for handling messages."""
         if msg == win32con.WM_DESTROY:
-            self.running = False
+            self.stop_updates()
             win32gui.PostQuitMessage(0)
             return 0
         elif msg == win32con.WM_USER + 20:  # System tray notification
@@ -259,7 +656,11 @@ start /b "" "{pythonw_path}" "{script_path}"
                 # Add version info (disabled)
                 win32gui.AppendMenu(menu, win32con.MF_STRING | win32con.MF_GRAYED, 0, f"System Tray Monitor v{VERSION}")
                 win32gui.AppendMenu(menu, win32con.MF_SEPARATOR, 0, "")
+                # Add refresh menu item
+                win32gui.AppendMenu(menu, win32con.MF_STRING, 4, "Refresh Now")
                 # Add autorun toggle menu item
+                if self.autorun_enabled is None:
+                    self.autorun_enabled = self.is_autorun_enabled()
                 autorun_text = "Disable Autorun" if self.autorun_enabled else "Enable Autorun"
                 win32gui.AppendMenu(menu, win32con.MF_STRING, 2, autorun_text)
                 win32gui.AppendMenu(menu, win32con.MF_SEPARATOR, 0, "")
@@ -284,120 +685,215 @@ start /b "" "{pythonw_path}" "{script_path}"
                 # Handle left click if needed
                 pass
             return 0
+        elif msg == WM_APPLY_UPDATES:
+            self.apply_pending_updates()
+            return 0
+        elif msg == WM_RELOAD_CONFIG:
+            self.reload_config()
+            return 0
         elif msg == win32con.WM_COMMAND:
             # Handle menu item selection
             if wparam == 1:  # Quit option
-                self.running = False
+                self.stop_updates()
                 win32gui.PostQuitMessage(0)
             elif wparam == 2:  # Autorun toggle
                 self.toggle_autorun()
             elif wparam == 3:  # Open .env file
                 self.open_env_file()
+            elif wparam == 4:  # Refresh now
+                self.refresh_now()
             return 0
         return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
 
-    def create_icon(self, label: str, path: str) -> bool:
+    def create_icon(self, label: str, path: str, source: str = DEFAULT_SOURCE) -> bool:
         """Create a system tray icon for a specific label and path."""
         try:
             logger.info(f"Creating system tray icon for {label} with path {path}")
             
             # Create a unique identifier for this icon
             icon_id = f"{label}_{path}"
+            history = History(self.config['history_size'])
+            sparkline = self.config['sparklines'].get(label)
+            
+            # Start with the last known value, marked as stale until new data arrives
+            value = "0"
+            tooltip = f"{label}: {value}"
+            saved = self.snapshot.icon(icon_id, source, path) if self.snapshot else None
+            if saved:
+                value = saved['value']
+                tooltip = self.stale_tooltip(label, value, saved.get('timestamp'))
+                logger.info(f"Showing last known value {value} for {label}")
             
             # Create the icon
-            icon_handle = self.create_icon_from_text(label, "0")
+            renderer, image = self.icon_image(label, value, history, sparkline)
+            icon_handle = self.create_icon_from_text(label, image, renderer)
             if not icon_handle:
                 logger.error(f"Failed to create icon handle for {label}")
                 return False
-
-            # Create the NOTIFYICONDATA structure
-            nid = NOTIFYICONDATA()
-            nid.cbSize = sizeof(NOTIFYICONDATA)
-            nid.hWnd = self.hwnd
-            nid.uID = len(self.icons)  # Use unique ID for each icon
-            nid.uFlags = win32gui.NIF_ICON | win32gui.NIF_MESSAGE | win32gui.NIF_TIP
-            nid.uCallbackMessage = win32con.WM_USER + 20
-            nid.hIcon = icon_handle
-            nid.szTip = f"{label}: 0"
-            
-            # Store the icon data
-            self.icons[icon_id] = {
-                'data': nid,
-                'label': label,
-                'path': path,
-                'created': False,
-                'icon_handle': icon_handle,
-                'uID': nid.uID  # Store the unique ID
-            }
+            
+            # Store the icon state, which takes over the handle
+            icon_info = IconState(label, path, source, self.config['expressions'][path], self.hwnd, self.next_uid,
+                                  win32con.WM_USER + 20, self.release_icon, history, sparkline)
+            self.next_uid += 1  # Use unique ID for each icon
+            icon_info.set_handle(icon_handle)
+            icon_info.value = value
+            icon_info.image = image
+            icon_info.tooltip = tooltip
+            icon_info.stale = bool(saved)
+            self.icons[icon_id] = icon_info
             
             # Create the icon using Shell_NotifyIconW
+            nid = icon_info.notify_data(win32gui.NIF_ICON | win32gui.NIF_MESSAGE | win32gui.NIF_TIP)
             if not Shell_NotifyIconW(win32gui.NIM_ADD, byref(nid)):
                 error_code = win32api.GetLastError()
                 logger.error(f"Failed to create icon for {label}. Error code: {error_code}")
                 return False
                 
             # Mark as created
-            self.icons[icon_id]['created'] = True
-            logger.info(f"Created icon for {label} with ID {nid.uID}")
+            icon_info.created = True
+            logger.info(f"Created icon for {label} with ID {icon_info.uid}")
             return True
             
         except Exception as e:
             logger.error(f"Error creating icon for {label}: {e}")
             return False
 
-    def update_icon(self, icon_id: str, value: str) -> bool:
-        """Update a system tray icon with a new value."""
+    def rebind_icon(self, icon_id: str, path: str, source: str) -> str:
+        """Point an existing icon at a new path and source, keeping its place in the tray."""
+        icon_info = self.icons.pop(icon_id)
+        if self.snapshot:
+            self.snapshot.remove_icon(icon_id)
+        new_icon_id = f"{icon_info.label}_{path}"
+        icon_info.path = path
+        icon_info.source = source
+        icon_info.expression = self.config['expressions'][path]
+        icon_info.history.clear()  # Samples of the old path do not belong to the new one
+        self.icons[new_icon_id] = icon_info
+        logger.info(f"Icon {icon_info.label} now reads {path} from source {source}")
+        return new_icon_id
+
+    def remove_icon(self, icon_id: str) -> bool:
+        """Remove a system tray icon."""
+        try:
+            icon_info = self.icons.pop(icon_id)
+            if self.snapshot:
+                self.snapshot.remove_icon(icon_id)
+            try:
+                if icon_info.created and not Shell_NotifyIconW(win32gui.NIM_DELETE,
+                                                               byref(icon_info.notify_data(0))):
+                    error_code = win32api.GetLastError()
+                    logger.error(f"Failed to delete icon for {icon_info.label}. Error code: {error_code}")
+                    return False
+            finally:
+                icon_info.close()
+            logger.info(f"Removed icon for {icon_info.label}")
+            return True
+        except Exception as e:
+            logger.error(f"Error removing icon {icon_id}: {e}")
+            return False
+
+    def update_icon(self, icon_id: str, value: str, tooltip: str = None) -> bool:
+        """Update a system tray icon with a new value, skipping the shell call if nothing changed."""
         try:
-            if icon_id not in self.icons or not self.icons[icon_id]['created']:
+            if icon_id not in self.icons or not self.icons[icon_id].created:
                 logger.error(f"Icon {icon_id} not found or not created")
                 return False
                 
             icon_info = self.icons[icon_id]
-            label = icon_info['label']
+            label = icon_info.label
+            if tooltip is None:
+                tooltip = f"{label}: {value}"
+            
+            # Nothing to do if the displayed image and tooltip are unchanged
+            renderer, image = self.icon_image(label, value, icon_info.history, icon_info.sparkline)
+            if image == icon_info.image:
+                icon_info.value = value
+                if tooltip == icon_info.tooltip:
+                    self.update_stats['skipped'] += 1
+                    logger.debug("Value for %s unchanged, skipping update", label)
+                    return True
+                return self.update_tooltip(icon_id, tooltip)
             
             # Create new icon with updated value
-            new_icon = self.create_icon_from_text(label, value)
+            new_icon = self.create_icon_from_text(label, image, renderer)
             if not new_icon:
                 logger.error(f"Failed to create new icon for {label}")
                 return False
 
-            # Create new NOTIFYICONDATA structure
-            nid = NOTIFYICONDATA()
-            nid.cbSize = sizeof(NOTIFYICONDATA)
-            nid.hWnd = self.hwnd
-            nid.uID = icon_info['uID']  # Use the stored unique ID
-            nid.uFlags = win32gui.NIF_ICON | win32gui.NIF_MESSAGE | win32gui.NIF_TIP
-            nid.uCallbackMessage = win32con.WM_USER + 20
-            nid.hIcon = new_icon
-            nid.szTip = f"{label}: {value}"
-            
-            # Update the icon using Shell_NotifyIconW
-            if not Shell_NotifyIconW(win32gui.NIM_MODIFY, byref(nid)):
+            # Show the new icon using Shell_NotifyIconW
+            nid = icon_info.notify_data(win32gui.NIF_ICON | win32gui.NIF_MESSAGE | win32gui.NIF_TIP, new_icon, tooltip)
+            with metrics.time('display'):
+                shell_result = Shell_NotifyIconW(win32gui.NIM_MODIFY, byref(nid))
+            if not shell_result:
                 error_code = win32api.GetLastError()
                 logger.error(f"Failed to update icon for {label}. Error code: {error_code}")
+                self.release_icon(new_icon)
                 return False
                 
-            # Update stored data
-            icon_info['data'] = nid
-            icon_info['icon_handle'] = new_icon
-            logger.info(f"Updated icon for {label} with value {value}")
+            # Update stored data; the previous handle is given back to the cache
+            icon_info.set_handle(new_icon)
+            icon_info.value = value
+            icon_info.image = image
+            icon_info.tooltip = tooltip
+            self.update_stats['applied'] += 1
+            logger.debug("Updated icon for %s with value %s", label, value)
             return True
             
         except Exception as e:
             logger.error(f"Error updating icon for {icon_id}: {e}")
             return False
 
+    def update_tooltip(self, icon_id: str, tooltip: str) -> bool:
+        """Update only the tooltip of a system tray icon."""
+        try:
+            icon_info = self.icons[icon_id]
+            
+            # Only send the tooltip to the shell
+            nid = icon_info.notify_data(win32gui.NIF_TIP, tooltip=tooltip)
+            
+            with metrics.time('display'):
+                shell_result = Shell_NotifyIconW(win32gui.NIM_MODIFY, byref(nid))
+            if not shell_result:
+                error_code = win32api.GetLastError()
+                logger.error(f"Failed to update tooltip for {icon_info.label}. Error code: {error_code}")
+                return False
+            
+            icon_info.tooltip = tooltip
+            self.update_stats['tooltip_only'] += 1
+            logger.debug("Updated tooltip for %s", icon_info.label)
+            return True
+            
+        except Exception as e:
+            logger.error(f"Error updating tooltip for {icon_id}: {e}")
+            return False
+
     def cleanup(self):
         """Clean up all system tray icons."""
         try:
+            logger.info(f"Icon update stats: {self.update_stats}")
+            for name, source in self.sources.items():
+                logger.info(f"API client stats for source {name}: {source['client'].connection_stats()}")
+                source['client'].close()
+            if self.recorder:
+                logger.info(f"Response log stats: {self.recorder.stats}")
+                self.recorder.close()
+            
             for icon_id, icon_info in self.icons.items():
-                if icon_info['created']:
+                if icon_info.created:
                     try:
-                        if not Shell_NotifyIconW(win32gui.NIM_DELETE, byref(icon_info['data'])):
+                        if not Shell_NotifyIconW(win32gui.NIM_DELETE, byref(icon_info.notify_data(0))):
                             error_code = win32api.GetLastError()
-                            logger.error(f"Failed to delete icon for {icon_info['label']}. Error code: {error_code}")
+                            logger.error(f"Failed to delete icon for {icon_info.label}. Error code: {error_code}")
                     except Exception as e:
-                        logger.error(f"Error cleaning up icon for {icon_info['label']}: {e}")
+                        logger.error(f"Error cleaning up icon for {icon_info.label}: {e}")
+                icon_info.close()
+            
+            # Release the cached icon handles, now that no icon shows them
+            self.icon_cache.clear()
+            self.chart_cache.clear()
+            
+            if self.snapshot:
+                self.snapshot.save()
             
             # Destroy the window
             if self.hwnd:
@@ -413,18 +909,27 @@ start /b "" "{pythonw_path}" "{script_path}"
         try:
             logger.info("Starting application...")
             
-            # Create all icons first
-            for label, path in self.config['icons']:
-                self.create_icon(label, path)
+            # Start one update thread per source so a slow source cannot delay the others.
+            # The first fetch runs while the icons are created; values are applied once they exist,
+            # by the message loop below
+            self.running = True
+            self.marshal_updates = True
+            for name in self.sources:
+                self.start_source(name)
+            if self.replay_file:
+                threading.Thread(target=self.replay_loop, name="replay", daemon=True).start()
+            
+            # Create all icons
+            with profile.phase("create icons"):
+                for label, path, source in self.config['icons']:
+                    self.create_icon(label, path, source)
+            self.icons_ready.set()
+            profile.mark("icons created")
             
-            # Wait a moment for icons to be created
-            time.sleep(0.5)
+            self.start_metrics()
             
-            # Start the update thread
-            self.running = True
-            self.update_thread = threading.Thread(target=self.update_loop)
-            self.update_thread.daemon = True
-            self.update_thread.start()
+            # Watch the .env file for changes without delaying the first values
+            threading.Thread(target=self.start_env_watcher, name="env-watcher", daemon=True).start()
             
             # Message loop
             while self.running:
@@ -445,160 +950,352 @@ start /b "" "{pythonw_path}" "{script_path}"
             logger.error(f"Error in main loop: {e}")
         finally:
             logger.info("Cleaning up...")
-            self.running = False
+            self.stop_updates()
             self.cleanup()
+            shutdown_logging()
             os._exit(0)  # Force exit after cleanup
 
-    def create_icon_from_text(self, label: str, value: str) -> int:
-        """Create an icon with text and return the icon handle."""
+    def stale_tooltip(self, label: str, value: str, timestamp: float = None) -> str:
+        """Return the tooltip of an icon showing a value saved by a previous run."""
+        if not timestamp:
+            return f"{label}: {value} (last known)"
+        saved_at = time.localtime(timestamp)
+        same_day = time.localtime()[:3] == saved_at[:3]
+        return f"{label}: {value} (last known {time.strftime('%H:%M' if same_day else '%Y-%m-%d %H:%M', saved_at)})"
+
+    def icon_image(self, label: str, value: str, history: History, sparkline: float = None) -> tuple:
+        """Return the renderer and what it should draw for an icon: the value, or the chart of a sparkline icon."""
+        if sparkline and self.load_sparkline_renderer():
+            timestamps, values = history.samples()
+            return self.sparkline_renderer, self.sparkline_renderer.chart(timestamps, values, time.time(), sparkline)
+        return self.renderer, value
+
+    def create_icon_from_text(self, label: str, value: str, renderer=None) -> int:
+        """Create an icon with text, or other content of the given renderer, and return the icon handle."""
         try:
-            logger.info(f"Creating icon for {label} with value {value}")
+            renderer = renderer or self.renderer
+            cache = self.icon_cache if renderer is self.renderer else self.chart_cache
             
-            # Create a new image with transparency
-            image = Image.new('RGBA', (32, 32), (0, 0, 0, 0))
-            draw = ImageDraw.Draw(image)
+            # Reuse a previously rendered icon for the same label, value and style
+            cache_key = (label, value, renderer.style_key())
+            icon_handle = cache.get(cache_key)
+            if icon_handle:
+                logger.debug("Using cached icon for %s with value %s", label, value)
+                return icon_handle
             
-            # Get font configuration from environment
-            font_path = os.getenv('FONT_PATH', 'C:\\Windows\\Fonts\\bahnschrift.ttf')
-            label_font_size = int(os.getenv('LABEL_FONT_SIZE', '13'))
-            value_font_size = int(os.getenv('VALUE_FONT_SIZE', '17'))
+            logger.debug("Creating icon for %s with value %s", label, value)
             
-            # Load fonts with different sizes
-            label_font = None
-            value_font = None
-            try:
-                label_font = ImageFont.truetype(font_path, label_font_size)
-                value_font = ImageFont.truetype(font_path, value_font_size)
-                logger.info(f"Using font: {font_path}")
-            except Exception as e:
-                logger.warning(f"Failed to load font {font_path}: {e}")
-                logger.warning("Using default font")
-                label_font = ImageFont.load_default()
-                value_font = ImageFont.load_default()
-            
-            # Draw the text - measure each line separately
-            label_width = draw.textlength(label, font=label_font)
-            value_width = draw.textlength(value, font=value_font)
-            max_width = max(label_width, value_width)
-            
-            # Calculate positions
-            label_position = ((32 - label_width) // 2, 1)
-            value_position = ((32 - value_width) // 2, 12)
-            
-            # Draw each line separately with different fonts
-            draw.text(label_position, label, fill='black', font=label_font)
-            draw.text(value_position, value, fill='black', font=value_font)
-            
-            # Save as PNG first (for transparency)
-            png_path = f"icon_{label}.png"
-            image.save(png_path, format='PNG')
-            logger.debug(f"Saved PNG to {png_path}")
-            
-            # Convert to ICO for Windows
-            ico_path = f"icon_{label}.ico"
-            img = Image.open(png_path)
-            img.save(ico_path, format='ICO')
-            logger.debug(f"Saved ICO to {ico_path}")
-            
-            # Load the icon
-            icon_handle = win32gui.LoadImage(
-                0,
-                ico_path,
-                win32con.IMAGE_ICON,
-                0, 0,
-                win32con.LR_LOADFROMFILE
+            # Render the icon to DIB bytes in memory
+            with metrics.time('render'):
+                dib = renderer.render(label, value)
+            
+            # Create the icon directly from the buffer
+            icon_handle = CreateIconFromResourceEx(
+                dib,
+                len(dib),
+                True,  # Icon, not cursor
+                0x00030000,  # Resource format version
+                renderer.size, renderer.size,
+                win32con.LR_DEFAULTCOLOR
             )
             
             if not icon_handle:
                 error = win32api.GetLastError()
-                logger.error(f"Failed to load icon image. Error code: {error}")
+                logger.error(f"Failed to create icon image. Error code: {error}")
                 return None
                 
-            logger.info(f"Successfully created icon handle: {icon_handle}")
-            
-            # Clean up temporary files
-            os.remove(png_path)
-            os.remove(ico_path)
-            
+            logger.debug("Successfully created icon handle: %s", icon_handle)
+            cache.put(cache_key, icon_handle)
             return icon_handle
             
         except Exception as e:
             logger.error(f"Error creating icon from text: {e}")
             return None
 
-    def update_loop(self):
-        """Periodically update the icons with new values."""
-        while self.running:
+    def release_icon(self, handle):
+        """Give back a reference to an icon handle to the cache that handed it out."""
+        cache = self.chart_cache if self.chart_cache.holds(handle) else self.icon_cache
+        cache.drop(handle)
+
+    def format_value(self, number: float, value_format) -> str:
+        """Format an icon's number for display with the format of its definition (an integer by default)."""
+        return value_format.format(number)
+
+    def apply_data(self, source_name: str, data, partial: bool = False) -> bool:
+        """Update the icons bound to a source from a decoded response and return whether any value changed.
+
+        With partial=True (streamed events), icons whose path is missing from the document keep their value.
+        """
+        self.icons_ready.wait()
+        
+        # Extract all configured paths in one pass
+        with metrics.time('extract', source=source_name):
+            values, errors = self.sources[source_name]['extractor'].extract(data)
+        return self.apply_values(source_name, values, errors, partial)
+
+    def apply_values(self, source_name: str, values: dict, errors: dict, partial: bool = False) -> bool:
+        """Update the icons bound to a source from extracted values and errors by path, see apply_data()."""
+        self.icons_ready.wait()
+        
+        # Update each icon bound to this source
+        changed = False
+        for icon_id, icon_info in list(self.icons.items()):
+            if icon_info.created and icon_info.source == source_name:
+                try:
+                    # Compute the value from the icon's JSON paths, which were extracted once for all icons
+                    expression = icon_info.expression
+                    path = next((path for path in expression.paths if path in errors), None)
+                    if path is not None:
+                        if partial:
+                            logger.debug("Path %s for %s not in event: %s", path, icon_id, errors[path])
+                        else:
+                            logger.error(f"Error reading path {path} for {icon_id}: {errors[path]}")
+                            metrics.increment('systray_icon_errors_total', icon=icon_info.label, kind='path')
+                        continue
+                    with metrics.time('format'):
+                        number = expression.evaluate(values)
+                        value = self.format_value(number, expression.value_format)
+                    icon_info.history.append(time.time(), number)
+                    logger.debug("Updating %s with value %s", icon_id, value)
+                    changed = changed or value != icon_info.value
+                    icon_info.value = value
+                    icon_info.stale = False
+                    
+                    # Update the icon
+                    if not self.submit_update(icon_id, value):
+                        logger.error(f"Failed to update icon {icon_id}")
+                        metrics.increment('systray_icon_errors_total', icon=icon_info.label, kind='update')
+                except Exception as e:
+                    logger.error(f"Error updating icon {icon_id}: {e}")
+                    metrics.increment('systray_icon_errors_total', icon=icon_info.label, kind='update')
+        return changed
+
+    def submit_update(self, icon_id: str, value: str, tooltip: str = None) -> bool:
+        """Hand an icon update to the message loop thread, replacing any update still pending for the icon."""
+        if not self.marshal_updates:
+            return self.update_icon(icon_id, value, tooltip)
+        if self.update_queue.put(icon_id, (value, tooltip)):
+            # The queue was empty, so the message loop has to be woken up to drain it
+            win32gui.PostMessage(self.hwnd, WM_APPLY_UPDATES, 0, 0)
+        return True
+
+    def apply_pending_updates(self):
+        """Apply the newest pending update of each icon, on the message loop thread."""
+        for icon_id, (value, tooltip) in self.update_queue.drain():
+            icon_info = self.icons.get(icon_id)
+            if icon_info is None:
+                logger.debug("Dropping update for removed icon %s", icon_id)
+                continue
+            if not self.update_icon(icon_id, value, tooltip):
+                logger.error(f"Failed to update icon {icon_id}")
+                metrics.increment('systray_icon_errors_total', icon=icon_info.label, kind='update')
+
+    def refresh_unchanged(self, source_name: str):
+        """Confirm the values of a source after a response without changes.
+
+        Redraws sparkline icons, as their chart moves on, and clears the stale mark of restored values.
+        """
+        self.icons_ready.wait()
+        
+        for icon_id, icon_info in list(self.icons.items()):
+            if icon_info.created and icon_info.source == source_name and \
+                    (icon_info.sparkline or icon_info.stale):
+                icon_info.stale = False
+                self.submit_update(icon_id, icon_info.value)
+
+    def save_snapshot(self, source_name: str, fingerprint: str = None):
+        """Record the current values of a source's icons and write the snapshot if any of them changed."""
+        if not self.snapshot or self.replay_file:
+            return  # Replayed values are not current
+        now = time.time()
+        for icon_id, icon_info in list(self.icons.items()):
+            if icon_info.source == source_name and not icon_info.stale:
+                self.snapshot.set_icon(icon_id, source_name, icon_info.path, icon_info.value, now)
+        source = self.sources.get(source_name)
+        if fingerprint and source:
+            self.snapshot.set_source(source_name, source['config']['url'], fingerprint)
+        self.snapshot.save()
+
+    def process_result(self, source_name: str, result, extractor=None) -> bool:
+        """Update the icons bound to a source from a fetch result and return whether any value changed.
+
+        A body that was not extracted while streaming is extracted with `extractor` if one is given,
+        otherwise decoded as a whole.
+        """
+        if result.not_modified or result.unchanged:
+            logger.debug("API response for source %s %s, keeping current values", source_name,
+                         "not modified" if result.not_modified else "unchanged")
+            self.refresh_unchanged(source_name)
+            changed = False
+        else:
+            values, errors = result.values, result.errors
+            if values is None and extractor is not None:
+                with metrics.time('extract', source=source_name):
+                    values, errors = extractor.extract_stream((result.content,))
+            if values is not None:
+                logger.debug("Extracted values from source %s: %s", source_name, values)
+                changed = self.apply_values(source_name, values, errors)
+            else:
+                with metrics.time('decode', source=source_name):
+                    data = result.json()
+                logger.debug("Received API response from source %s: %s", source_name, data)
+                changed = self.apply_data(source_name, data)
+            self.save_snapshot(source_name, result.fingerprint)
+        self.profile_first_result(source_name, True)
+        return changed
+
+    def profile_first_result(self, source_name: str, success: bool):
+        """With --profile-startup, log the startup profile once the first values are shown.
+
+        Also logs it if every source failed before any value was shown, as the values may never come.
+        """
+        if not self.profile_startup:
+            return
+        with self.startup_lock:
+            if any(name == "first value" for name, _ in profile.milestones):
+                return
+            if success:
+                profile.mark("first value")
+            else:
+                self.startup_failures.add(source_name)
+                if not self.startup_failures >= set(self.sources) or \
+                        any(name == "all sources failed" for name, _ in profile.milestones):
+                    return
+                profile.mark("all sources failed")
+            report = profile.report()
+        logger.info(report)
+
+    def replay_loop(self):
+        """Apply the responses of a response log to the icons of their sources, paced by replay_speed."""
+        pace = f"{self.replay_speed:g}x speed" if self.replay_speed > 0 else "full speed"
+        logger.info(f"Replaying {self.replay_file} at {pace}")
+        counts = {'replayed': 0, 'changed': 0, 'skipped': 0, 'errors': 0}
+        busy = 0.0  # Seconds spent in the pipeline, without reading the log and waiting
+        applied_start = self.update_stats['applied']
+        start = time.perf_counter()
+        try:
+            for response in paced(read_responses(self.replay_file), self.replay_speed, self.replay_stop):
+                source = self.sources.get(response.source)
+                if source is None:
+                    counts['skipped'] += 1
+                    continue
+                poll_start = time.perf_counter()
+                try:
+                    extractor = source['extractor'] if source['config']['extract'] == 'stream' else None
+                    if self.process_result(response.source, response.result(), extractor):
+                        counts['changed'] += 1
+                    counts['replayed'] += 1
+                except Exception as e:
+                    logger.error(f"Error replaying response of source {response.source}: {e}")
+                    counts['errors'] += 1
+                poll_time = time.perf_counter() - poll_start
+                busy += poll_time
+                metrics.observe('poll', poll_time, source=response.source)
+        except Exception as e:
+            logger.error(f"Error reading response log {self.replay_file}: {e}")
+        elapsed = time.perf_counter() - start
+        rate = counts['replayed'] / busy if busy else 0.0
+        logger.info(f"Replay finished in {elapsed:.2f}s: {counts}, {busy:.2f}s in the pipeline "
+                    f"({rate:.0f} responses/s), {self.update_stats['applied'] - applied_start} icon updates")
+        return counts
+
+    def update_loop(self, source_name: str = DEFAULT_SOURCE):
+        """Periodically update the icons bound to a source with new values."""
+        source = self.sources[source_name]
+        scheduler = source['scheduler']
+        while self.running and source['active']:
+            poll_start = time.perf_counter()
             try:
-                # Get API configuration from environment
-                api_url = os.getenv('API_URL')
-                api_headers = {'Accept': os.getenv('API_HEADERS_ACCEPT', 'application/json')}
-                poll_interval = int(os.getenv('POLL_INTERVAL', '30'))
-                
-                # Fetch data from API
-                response = requests.get(api_url, headers=api_headers)
-                response.raise_for_status()
-                data = response.json()
-                logger.info(f"Received API response: {data}")
-                
-                # Update each icon
-                for icon_id, icon_info in self.icons.items():
-                    if icon_info['created']:
-                        try:
-                            # Get value from JSON path
-                            value = data
-                            for part in icon_info['path'].split('.'):
-                                value = value[part]
-                            value = str(int(float(value)))  # Convert to integer and then string
-                            logger.info(f"Updating {icon_id} with value {value}")
-                            
-                            # Update the icon
-                            if not self.update_icon(icon_id, value):
-                                logger.error(f"Failed to update icon {icon_id}")
-                        except Exception as e:
-                            logger.error(f"Error updating icon {icon_id}: {e}")
-                
-                # Wait for next update
-                time.sleep(poll_interval)
+                # Fetch data from API (streamed through the path extractor in stream extract mode;
+                # when recording, the whole body is read for the log and extracted afterwards)
+                extractor = source['extractor'] if source['config']['extract'] == 'stream' else None
+                sent = time.time()
+                with metrics.time('fetch', source=source_name):
+                    result = source['client'].fetch(None if self.recorder else extractor)
+                if self.recorder:
+                    self.recorder.record(source_name, result, sent)
+                scheduler.record_success(self.process_result(source_name, result, extractor))
+                metrics.observe('poll', time.perf_counter() - poll_start, source=source_name)
                 
             except Exception as e:
-                logger.error(f"Error in update loop: {e}")
-                time.sleep(5)  # Wait a bit before retrying
+                if not source['active']:
+                    break
+                logger.error(f"Error in update loop for source {source_name}: {e}")
+                metrics.increment('systray_fetch_errors_total', source=source_name)
+                scheduler.record_failure()
+                self.profile_first_result(source_name, False)
+            
+            # Wait for next update (interrupted by refresh, reload and quit)
+            delay = scheduler.next_delay()
+            logger.debug("Next poll of source %s in %.1fs", source_name, delay)
+            scheduler.wait()
+
+    def stream_loop(self, source_name: str):
+        """Keep a streaming connection to a source open and apply each event as it arrives."""
+        source = self.sources[source_name]
+        client = source['client']
+        scheduler = source['scheduler']
+        while self.running and source['active']:
+            try:
+                for data in client.events():
+                    logger.debug("Received stream event from source %s: %s", source_name, data)
+                    scheduler.record_success(self.apply_data(source_name, data, partial=True))
+                    self.save_snapshot(source_name)
+                    self.profile_first_result(source_name, True)
+                    if not (self.running and source['active']):
+                        break
+                else:
+                    logger.info(f"Stream for source {source_name} ended, reconnecting")
+            except Exception as e:
+                if not (self.running and source['active']):
+                    break
+                logger.error(f"Error in stream for source {source_name}: {e}")
+                metrics.increment('systray_fetch_errors_total', source=source_name)
+                scheduler.record_failure()
+                self.profile_first_result(source_name, False)
+            
+            # Reconnect right away after a clean end (or after the delay the server asked for),
+            # back off exponentially after errors
+            if scheduler.failures:
+                delay = scheduler.next_delay()
+            else:
+                delay = scheduler.next_delay(client.retry_delay or 1.0)
+            logger.debug("Reconnecting to source %s in %.1fs", source_name, delay)
+            scheduler.wait()
 
 if __name__ == "__main__":
     # Parse command line arguments
     log_to_file = "--log-to-file" in sys.argv
+    profile_startup = "--profile-startup" in sys.argv
+    record_file = option_value("--record")
+    replay_file = option_value("--replay")
+    try:
+        replay_speed = float(option_value("--speed", "1"))
+    except ValueError:
+        sys.exit("--speed needs a number, e.g. 10 for ten times real time or 0 for as fast as possible")
+    if record_file and replay_file:
+        sys.exit("--record and --replay cannot be combined")
     
     # Set up logging
     setup_logging(log_to_file)
     
-    # Get icon configuration from environment
-    icons = []
-    for key, value in os.environ.items():
-        if key.startswith('ICON_'):
-            label = key[5:]  # Remove 'ICON_' prefix
-            icons.append((label, value))
-    
-    # Configuration
-    config = {
-        'api_url': os.getenv('API_URL'),
-        'api_headers': {
-            "Accept": os.getenv('API_HEADERS_ACCEPT', 'application/json')
-        },
-        'poll_interval': int(os.getenv('POLL_INTERVAL', '30')),
-        'icons': icons
-    }
+    # Get source and icon configuration from environment
+    with profile.phase("load config"):
+        config = load_config()
     
     app = None
     try:
-        app = SystemTray(config)
+        with profile.phase("initialize application"):
+            app = SystemTray(config, profile_startup, record_file, replay_file, replay_speed)
         app.run()
     except KeyboardInterrupt:
         logger.info("Received keyboard interrupt")
         if app:
             app.cleanup()
+        shutdown_logging()
     except Exception as e:
         logger.error(f"Unexpected error: {e}")
         if app:
             app.cleanup()
+        shutdown_logging()
         sys.exit(1) 
\ No newline at end of file
@@ -0,0 +1,52 @@
+import threading
+from collections import OrderedDict
+
+
+class CoalescingQueue:
+    """Thread-safe queue that keeps only the newest pending item per key.
+
+    Producers put items from any thread; the consumer takes all pending items at once with drain().
+    Keys are drained in the order they were first queued since the last drain, each with its newest item.
+    """
+
+    def __init__(self):
+        self.pending = OrderedDict()
+        self.puts = 0
+        self.coalesced = 0  # Items replaced by a newer one before they were drained
+        self.drained = 0
+        self.wakeups = 0  # Puts that found the queue empty and had to wake the consumer
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.pending)
+
+    def put(self, key, item) -> bool:
+        """Queue an item, replacing a pending item for the same key.
+
+        Returns True if the queue was empty, i.e. the consumer needs to be woken up. As long as the
+        consumer drains the queue after each wake-up, no item is left behind.
+        """
+        with self.lock:
+            self.puts += 1
+            wake = not self.pending
+            if key in self.pending:
+                self.coalesced += 1
+            self.pending[key] = item
+            if wake:
+                self.wakeups += 1
+            return wake
+
+    def drain(self) -> list:
+        """Remove and return all pending (key, item) pairs."""
+        with self.lock:
+            items = list(self.pending.items())
+            self.pending.clear()
+            self.drained += len(items)
+            return items
+
+    def stats(self) -> dict:
+        """Return the number of pending items and the put, coalesce, drain and wake-up counts."""
+        with self.lock:
+            return {'pending': len(self.pending), 'puts': self.puts, 'coalesced': self.coalesced,
+                    'drained': self.drained, 'wakeups': self.wakeups}